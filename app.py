@@ -4,6 +4,16 @@ import pandas as pd
 from datetime import datetime
 import pytz
 import time
+from functools import partial
+
+from cache_ttl import CacheTTL
+from cola_local import ColaEntregas
+from consultas import buscar_beneficiario, catalogo, centros_acopio, estadisticas, funcionarios
+from indice_ruts import IndiceRuts
+from instrumentacion import ClienteInstrumentado, RegistroConsultas
+from normalizacion import (LARGO_MINIMO_RUT, digito_verificador, es_rut, formatear_rut, limpiar_rut,
+                           rut_valido)
+from reportes import generar_reporte
 
 # --- CONFIGURACIÓN INICIAL COMPACTA ---
 st.set_page_config(page_title="Ayuda Penco", layout="wide", page_icon="🇨🇱")
@@ -31,42 +41,192 @@ def init_connection():
         st.error(f"Error de conexión: Revisa el archivo secrets.toml. Detalle: {e}")
         st.stop()
 
-supabase = init_connection()
+# --- MEDICIÓN DE CONSULTAS (compartida entre sesiones, se ve en el panel de jefes) ---
+@st.cache_resource
+def init_registro():
+    return RegistroConsultas()
+
+registro = init_registro()
+supabase = ClienteInstrumentado(init_connection(), registro)
+
+# --- CACHE DE DATOS DE REFERENCIA (compartida entre sesiones) ---
+@st.cache_resource
+def init_cache():
+    return CacheTTL(ttl=300)
+
+cache = init_cache()
+
+# --- ÍNDICE DEL PADRÓN PARA EL BUSCADOR (en memoria, se refresca solo cada 10 minutos) ---
+@st.cache_resource
+def init_indice():
+    indice = IndiceRuts()
+    indice.iniciar_refresco(supabase)
+    return indice
+
+indice = init_indice()
+
+# --- COLA LOCAL DE ENTREGAS (una por centro, se sube sola en segundo plano) ---
+@st.cache_resource
+def init_cola(centro):
+    cola = ColaEntregas(centro)
+    cola.iniciar_envio(supabase)
+    return cola
+
+def opciones_con(valores, por_defecto):
+    # Lista para un selectbox que siempre incluye el valor por defecto
+    return valores if por_defecto in valores else [por_defecto] + valores
 
 # --- BARRA LATERAL (CONFIGURACIÓN) ---
 with st.sidebar:
     st.header("⚙️ Configuración")
-    centro_actual = st.text_input("Centro de Acopio", value="Liceo Pencopolitano")
+    try:
+        lista_centros, lista_funcionarios = centros_acopio(supabase, cache), funcionarios(supabase, cache)
+    except Exception:
+        lista_centros, lista_funcionarios = [], []
+    # Se elige de la lista o se escribe uno nuevo
+    opciones_centro = opciones_con(lista_centros, "Liceo Pencopolitano")
+    centro_actual = st.selectbox("Centro de Acopio", opciones_centro,
+                                 index=opciones_centro.index("Liceo Pencopolitano"), accept_new_options=True)
     # CAMBIO: Ahora dice Funcionario
-    usuario_actual = st.text_input("Funcionario Responsable", value="Funcionario Turno 1")
+    opciones_funcionario = opciones_con(lista_funcionarios, "Funcionario Turno 1")
+    usuario_actual = st.selectbox("Funcionario Responsable", opciones_funcionario,
+                                  index=opciones_funcionario.index("Funcionario Turno 1"), accept_new_options=True)
+    supabase = supabase.con_centro(centro_actual) # Desde aquí las consultas quedan a nombre del centro
+    cola = init_cola(centro_actual)
     st.divider()
     st.caption(f"🕒 Hora Sistema: {datetime.now(chile_time).strftime('%H:%M')}")
-    st.success("🟢 Conectado")
+    pendientes = cola.contar()
+    if cola.ultimo_error:
+        st.warning(f"🟠 Sin conexión: {pendientes} entregas guardadas en este equipo, se subirán solas.")
+    else:
+        st.success("🟢 Conectado")
+        if pendientes:
+            st.caption(f"⏳ {pendientes} entregas por sincronizar")
+    fallidas = cola.fallidas()
+    if fallidas:
+        # Rechazadas por el servidor: no se reintentan solas para no trabar la cola
+        st.error(f"❌ {len(fallidas)} entregas rechazadas por el servidor, no se subieron.")
+        with st.expander("Ver rechazadas"):
+            st.dataframe(pd.DataFrame(fallidas)[['rut_beneficiario', 'item', 'cantidad', 'error']], hide_index=True)
+            st.button("🔁 Reintentar", on_click=cola.reintentar_fallidas, use_container_width=True)
 
 st.title("I. Municipalidad de Penco - Gestión de Ayudas")
 
 # --- BUSCADOR COMPACTO ---
 col_input, col_btn = st.columns([5, 1])
 with col_input:
-    rut_input_raw = st.text_input("Buscador", placeholder="Ingrese RUT aquí...", label_visibility="collapsed")
+    rut_input_raw = st.text_input("Buscador", key="buscador", placeholder="Ingrese RUT o nombre aquí...", label_visibility="collapsed")
 with col_btn:
     btn_buscar = st.button("BUSCAR", type="primary", use_container_width=True)
 
-# Función de limpieza
-def limpiar_rut(rut):
-    return rut.replace(".", "").replace("-", "").strip().upper()
-
 # --- LÓGICA PRINCIPAL ---
-if rut_input_raw:
-    rut_limpio = limpiar_rut(rut_input_raw)
-    
-    # 1. BUSCAR DATOS
-    try:
-        response = supabase.table("beneficiarios").select("*").eq("rut", rut_limpio).execute()
-        datos_persona = response.data
-    except Exception as e:
-        st.error("Error de conexión.")
-        st.stop()
+TTL_FICHA = 60  # segundos que se reutiliza la ficha buscada mientras se atiende a la misma persona
+
+def sin_repetidas(entregas):
+    # Una entrega puede venir del servidor y de la cola local a la vez: se muestra una sola vez
+    vistas, unicas = set(), []
+    for e in entregas:
+        clave = e.get('clave_idempotencia')
+        if clave and clave in vistas:
+            continue
+        vistas.add(clave)
+        unicas.append(e)
+    return unicas
+
+def ficha_sin_conexion(rut, en_cola, hoy_en_cola):
+    # Sin Supabase la ficha sale del índice en memoria y las entregas, de la cola de este equipo
+    persona = indice.ficha(rut)
+    if not persona:
+        return None
+    ruts_hogar = indice.hogar(rut)
+    return {"persona": persona, "ruts_hogar": ruts_hogar,
+            "entregas_hoy_hogar": [e for e in hoy_en_cola if e['rut_beneficiario'] in ruts_hogar],
+            "historial": list(reversed(en_cola))}
+
+def elegir_sugerencia(rut):
+    # Corre antes del siguiente rerun: el buscador ya aparece con el RUT elegido
+    st.session_state["buscador"] = formatear_rut(rut)
+
+def confirmar_rut_corto(rut):
+    st.session_state["rut_corto_confirmado"] = rut
+
+def mostrar_sugerencias(sugerencias, titulo):
+    if not sugerencias:
+        return
+    st.caption(titulo)
+    for col, s in zip(st.columns(len(sugerencias)), sugerencias):
+        col.button(f"{formatear_rut(s['rut'])} · {s['nombre']}", key=f"sugerencia_{s['rut']}", help=s['direccion'],
+                   on_click=elegir_sugerencia, args=(s['rut'],), use_container_width=True)
+
+# Las sugerencias salen del índice en memoria: solo el RUT completo va a Supabase
+rut_limpio = limpiar_rut(rut_input_raw) if rut_input_raw else ""
+buscar_ficha = False
+if rut_input_raw and not es_rut(rut_limpio):
+    # Búsqueda por nombre
+    sugerencias = indice.buscar_nombre(rut_input_raw)
+    if sugerencias:
+        mostrar_sugerencias(sugerencias, "🔎 Fichas con ese nombre (clic para abrir):")
+    elif not indice.listo:
+        st.info("⏳ Cargando el padrón para buscar por nombre, intente en unos segundos.")
+    else:
+        st.warning(f"Ninguna ficha con el nombre '{rut_input_raw}'.")
+elif rut_input_raw and len(rut_limpio) < LARGO_MINIMO_RUT and not (
+        rut_valido(rut_limpio) and (indice.ficha(rut_limpio)
+                                    or st.session_state.get("rut_corto_confirmado") == rut_limpio)):
+    # RUT a medio escribir. Uno corto pero válido (como 999.999-9) se busca solo si está en el
+    # padrón cargado o si el funcionario confirma que está completo: si no, se abriría el registro
+    st.info("RUT incompleto.")
+    mostrar_sugerencias(indice.buscar_rut(rut_limpio), "🔎 RUT que empiezan así:")
+    if rut_valido(rut_limpio):
+        st.button(f"El RUT {formatear_rut(rut_limpio)} está completo: buscarlo",
+                  on_click=confirmar_rut_corto, args=(rut_limpio,))
+elif rut_input_raw:
+    buscar_ficha = True
+    if not rut_valido(rut_limpio):
+        corregido = rut_limpio[:-1] + digito_verificador(rut_limpio[:-1])
+        st.warning(f"⚠️ El dígito verificador no corresponde: {formatear_rut(rut_limpio)} "
+                   f"debería ser {formatear_rut(corregido)}.")
+
+if buscar_ficha:
+    # 1. BUSCAR DATOS (ficha + hogar + entregas de hoy + historial en una sola llamada)
+    # La ficha queda guardada en la sesión: elegir ítems o confirmar una entrega no vuelve a consultar.
+    sesion = st.session_state.get("ficha")
+    if btn_buscar or not sesion or sesion["rut"] != rut_limpio or time.time() - sesion["hora"] > TTL_FICHA:
+        # La cola local se lee antes que el servidor: si se sube justo entremedio, la entrega
+        # aparece repetida (y se descarta por su clave) en vez de perderse de la alerta.
+        # Como el hogar se conoce recién con la respuesta, se leen todas las de hoy y se filtran después.
+        en_cola = cola.pendientes_de([rut_limpio])
+        hoy_en_cola = cola.pendientes_hoy()
+        misma_persona = sesion and sesion["rut"] == rut_limpio
+        try:
+            ficha = buscar_beneficiario(supabase, rut_limpio)
+            del_hogar = [e for e in hoy_en_cola if e['rut_beneficiario'] in ficha["ruts_hogar"]]
+            ficha = dict(ficha,
+                         historial=sin_repetidas(list(reversed(en_cola)) + ficha["historial"]),
+                         entregas_hoy_hogar=sin_repetidas(ficha["entregas_hoy_hogar"] + del_hogar))
+            sin_conexion = False
+        except Exception as e:
+            if misma_persona and not sesion.get("sin_conexion"):
+                # Sin conexión se sigue con la ficha ya cargada: la entrega igual queda en la cola local
+                st.warning("⚠️ Sin conexión: se muestra la ficha cargada a las "
+                           f"{datetime.fromtimestamp(sesion['hora'], chile_time).strftime('%H:%M')}.")
+                ficha = None
+            else:
+                ficha = ficha_sin_conexion(rut_limpio, en_cola, hoy_en_cola)
+                if not ficha:
+                    st.error("Error de conexión: el RUT no está en el padrón guardado en este equipo.")
+                    st.stop()
+                sin_conexion = True
+        if ficha:
+            if not misma_persona:
+                st.session_state["carrito"] = []
+            sesion = st.session_state["ficha"] = {"rut": rut_limpio, "hora": time.time(), "datos": ficha,
+                                                  "sin_conexion": sin_conexion}
+    if sesion.get("sin_conexion"):
+        st.warning("⚠️ Sin conexión: ficha armada con el padrón guardado en este equipo. El historial y la "
+                   "alerta de dirección solo muestran lo entregado en este centro mientras no vuelva la conexión.")
+    ficha = sesion["datos"]
+    datos_persona = [ficha["persona"]] if ficha["persona"] else []
 
     if len(datos_persona) > 0:
         p = datos_persona[0]
@@ -77,81 +237,124 @@ if rut_input_raw:
             c1.markdown(f"**RUT:** {p['rut']}")
             c2.markdown(f"**Nombre:** {p['nombre']}")
             c3.markdown(f"**Dirección:** {p['direccion']}")
-            c4.markdown(f"**Fam:** {p['cant_familia']}")
+            c4.markdown(f"**Fam:** {p.get('cant_familia', '?')}")
             
-            if not p['afectado']:
+            if not p.get('afectado', True): # sin conexión no se sabe
                 st.warning("⚠️ RUT NO FIGURA EN LISTA FIBE/OFICIAL")
 
-        # --- VALIDACIÓN CRUZADA DE DIRECCIÓN (NUEVO) ---
-        # Buscamos quién más vive en esa dirección
-        try:
-            vecinos = supabase.table("beneficiarios").select("rut, nombre").eq("direccion", p['direccion']).execute()
-            lista_ruts_casa = [v['rut'] for v in vecinos.data]
-            
-            # Buscamos entregas HOY para CUALQUIERA de esos ruts
-            if lista_ruts_casa:
-                entregas_casa = supabase.table("entregas").select("*").in_("rut_beneficiario", lista_ruts_casa).execute()
-                df_casa = pd.DataFrame(entregas_casa.data)
-                
-                if not df_casa.empty:
-                    df_casa['fecha_entrega'] = pd.to_datetime(df_casa['fecha_entrega']).dt.tz_convert(chile_time)
-                    hoy = datetime.now(chile_time).date()
-                    # Filtramos entregas de hoy en esa casa
-                    entregas_hoy_casa = df_casa[df_casa['fecha_entrega'].dt.date == hoy]
-                    
-                    if not entregas_hoy_casa.empty:
-                        # Alerta Roja: Alguien en esta casa ya recibió algo
-                        st.error(f"🛑 ALERTA DE DIRECCIÓN: En '{p['direccion']}' ya se entregó ayuda HOY.")
-                        st.dataframe(
-                            entregas_hoy_casa[['rut_beneficiario', 'item', 'centro_acopio', 'fecha_entrega']],
-                            hide_index=True,
-                            column_config={
-                                "rut_beneficiario": "RUT que retiró",
-                                "fecha_entrega": st.column_config.DatetimeColumn("Hora", format="HH:mm")
-                            }
-                        )
-
-        except Exception as e:
-            pass # Si falla la validación cruzada, no bloqueamos el sistema
+        # La alerta de dirección se dibuja aquí, pero se llena al final (ya con la entrega de este clic)
+        alerta = st.container()
 
     else:
         # --- REGISTRO DE NUEVO (Formulario Compacto) ---
         st.warning(f"RUT {rut_limpio} no encontrado.")
-        with st.form("form_nuevo"):
-            st.markdown("**Registrar Nueva Ficha**")
-            c1, c2 = st.columns(2)
-            new_nombre = c1.text_input("Nombre")
-            new_rut = c2.text_input("RUT", value=rut_limpio, disabled=True)
-            c3, c4, c5 = st.columns([2, 2, 1])
-            new_direccion = c3.text_input("Dirección")
-            new_sector = c4.text_input("Sector")
-            new_fam = c5.number_input("Familia", 1, 15, 1)
-            
-            if st.form_submit_button("💾 Guardar", type="primary"):
-                if new_nombre and new_direccion:
-                    datos = {
-                        "rut": rut_limpio, "nombre": new_nombre, 
-                        "direccion": new_direccion, "sector": new_sector,
-                        "cant_familia": new_fam, "afectado": True,
-                        "fecha_registro": datetime.now(chile_time).isoformat()
-                    }
-                    supabase.table("beneficiarios").insert(datos).execute()
-                    st.rerun()
+        mostrar_sugerencias([s for s in indice.buscar_rut(rut_limpio) if s["rut"] != rut_limpio], "¿Quiso decir?")
+        if not rut_valido(rut_limpio):
+            # Un RUT mal escrito terminaría como una ficha duplicada
+            st.error("Corrija el RUT antes de registrar una ficha nueva.")
+        else:
+            with st.form("form_nuevo"):
+                st.markdown("**Registrar Nueva Ficha**")
+                c1, c2 = st.columns(2)
+                new_nombre = c1.text_input("Nombre")
+                new_rut = c2.text_input("RUT", value=rut_limpio, disabled=True)
+                c3, c4, c5 = st.columns([2, 2, 1])
+                new_direccion = c3.text_input("Dirección")
+                new_sector = c4.text_input("Sector")
+                new_fam = c5.number_input("Familia", 1, 15, 1)
+                
+                if st.form_submit_button("💾 Guardar", type="primary"):
+                    if new_nombre and new_direccion:
+                        datos = {
+                            "rut": rut_limpio, "nombre": new_nombre, 
+                            "direccion": new_direccion, "sector": new_sector,
+                            "cant_familia": new_fam, "afectado": True,
+                            "fecha_registro": datetime.now(chile_time).isoformat()
+                        }
+                        # La base de datos le calcula la clave de dirección (trigger, ver supabase/migrations)
+                        nueva = supabase.table("beneficiarios").insert(datos).execute().data[0]
+                        indice.agregar(rut_limpio, new_nombre, new_direccion, nueva.get("direccion_clave"))
+                        st.session_state.pop("ficha", None) # La ficha recién creada se vuelve a buscar
+                        st.rerun()
 
     # --- HISTORIAL Y ENTREGA ---
     if len(datos_persona) > 0:
-        
-        # Cargar historial
-        historial = supabase.table("entregas").select("*").eq("rut_beneficiario", rut_limpio).order("fecha_entrega", desc=True).execute()
-        df = pd.DataFrame(historial.data)
-
         st.markdown("---")
         c_historial, c_form = st.columns([3, 2]) # Dividimos pantalla: Izq Historial, Der Formulario
 
+        # El formulario va primero en el código para que el historial y la alerta ya incluyan lo entregado
+        with c_form:
+            st.write("📦 **Entregar Ayuda**")
+            with st.container(border=True):
+                # Cargar items (desde la cache; se refresca sola cada 5 minutos)
+                try:
+                    lista = catalogo(supabase, cache) + ["➕ OTRO..."]
+                except Exception: # sin conexión y sin catálogo guardado: se escribe el ítem
+                    lista = ["➕ OTRO..."]
+                
+                sel_item = st.selectbox("Item", lista, label_visibility="collapsed")
+                nuevo_txt = ""
+                if sel_item == "➕ OTRO...":
+                    nuevo_txt = st.text_input("Nombre nuevo prod.")
+                final_item = nuevo_txt.strip().title() if sel_item.startswith("➕") else sel_item
+                
+                c_cant, c_add = st.columns([1, 2])
+                cant = c_cant.number_input("Cant", 1, 10, 1, label_visibility="collapsed")
+                
+                # Carrito: varios ítems para el mismo RUT que se confirman juntos
+                carrito = st.session_state.setdefault("carrito", [])
+                if c_add.button("➕ Agregar otro ítem", use_container_width=True):
+                    if not final_item:
+                        st.error("Escriba nombre.")
+                    else:
+                        carrito.append({"item": final_item, "cantidad": cant, "nuevo": sel_item.startswith("➕")})
+                
+                if carrito:
+                    c_lista, c_vaciar = st.columns([3, 1])
+                    if c_vaciar.button("Vaciar"):
+                        carrito.clear()
+                    c_lista.caption("🛒 " + " · ".join(f"{l['cantidad']} x {l['item']}" for l in carrito))
+                
+                etiqueta = f"CONFIRMAR {len(carrito)} ÍTEMS" if len(carrito) > 1 else "CONFIRMAR ENTREGA"
+                if st.button(etiqueta, type="primary", use_container_width=True):
+                    lineas = carrito or [{"item": final_item, "cantidad": cant, "nuevo": sel_item.startswith("➕")}]
+                    
+                    if not all(l["item"] for l in lineas):
+                        st.error("Escriba nombre.")
+                    else:
+                        for l in lineas:
+                            if l["nuevo"]:
+                                try: supabase.table("catalogo_ayuda").insert({"nombre_item": l["item"]}).execute()
+                                except: pass
+                                cache.invalidar("catalogo")
+
+                        ahora = datetime.now(chile_time).isoformat()
+                        datos_entregas = [{
+                            "rut_beneficiario": rut_limpio,
+                            "item": l["item"],
+                            "cantidad": l["cantidad"],
+                            "centro_acopio": centro_actual,
+                            "usuario_responsable": usuario_actual, # Guarda el funcionario
+                            "fecha_entrega": ahora
+                        } for l in lineas]
+                        # Quedan guardadas en este equipo al instante; el hilo de envío las sube a Supabase
+                        # en un solo insert. Sin recargar la página: se agregan a la ficha de la sesión.
+                        nuevas = cola.encolar_varias(datos_entregas)
+                        ficha["historial"] = list(reversed(nuevas)) + ficha["historial"]
+                        ficha["entregas_hoy_hogar"] = ficha["entregas_hoy_hogar"] + nuevas
+                        carrito.clear()
+                        # Un centro o funcionario nuevo debe aparecer en la lista de la barra lateral
+                        if centro_actual not in lista_centros: cache.invalidar("centros")
+                        if usuario_actual not in lista_funcionarios: cache.invalidar("funcionarios")
+                        st.toast(f"✅ Entregado: {', '.join(l['item'] for l in lineas)}")
+
         with c_historial:
+            # Historial (ya viene en la ficha, ordenado del más reciente al más antiguo)
+            df = pd.DataFrame(ficha["historial"])
             st.write("📋 **Historial Personal**")
             if not df.empty:
-                df['fecha_entrega'] = pd.to_datetime(df['fecha_entrega']).dt.tz_convert(chile_time)
+                # Las del servidor vienen en UTC y las de la cola en hora de Chile: se unifican en UTC
+                df['fecha_entrega'] = pd.to_datetime(df['fecha_entrega'], format="ISO8601", utc=True).dt.tz_convert(chile_time)
                 
                 # Tabla profesional con fecha formateada y funcionario
                 st.dataframe(
@@ -170,43 +373,30 @@ if rut_input_raw:
             else:
                 st.info("Sin retiros anteriores.")
 
-        with c_form:
-            st.write("📦 **Entregar Ayuda**")
-            with st.container(border=True):
-                # Cargar items
-                items_db = supabase.table("catalogo_ayuda").select("nombre_item").execute()
-                lista = [i['nombre_item'] for i in items_db.data] + ["➕ OTRO..."]
-                
-                sel_item = st.selectbox("Item", lista, label_visibility="collapsed")
-                nuevo_txt = ""
-                if sel_item == "➕ OTRO...":
-                    nuevo_txt = st.text_input("Nombre nuevo prod.")
-                
-                c_cant, c_btn = st.columns([1, 2])
-                cant = c_cant.number_input("Cant", 1, 10, 1, label_visibility="collapsed")
+        # --- VALIDACIÓN CRUZADA DE DIRECCIÓN (NUEVO) ---
+        # Entregas de HOY a cualquiera que viva en esa dirección (ya filtradas en el servidor),
+        # más las de la cola local y las recién confirmadas en esta sesión
+        with alerta:
+            try:
+                df_casa = pd.DataFrame(ficha["entregas_hoy_hogar"])
                 
-                if c_btn.button("CONFIRMAR ENTREGA", type="primary", use_container_width=True):
-                    final_item = nuevo_txt.strip().title() if sel_item.startswith("➕") else sel_item
+                if not df_casa.empty:
+                    df_casa['fecha_entrega'] = pd.to_datetime(df_casa['fecha_entrega'], format="ISO8601", utc=True).dt.tz_convert(chile_time)
                     
-                    if sel_item.startswith("➕") and not final_item:
-                        st.error("Escriba nombre.")
-                    else:
-                        if sel_item.startswith("➕"):
-                            try: supabase.table("catalogo_ayuda").insert({"nombre_item": final_item}).execute()
-                            except: pass
-
-                        datos_entrega = {
-                            "rut_beneficiario": rut_limpio,
-                            "item": final_item,
-                            "cantidad": cant,
-                            "centro_acopio": centro_actual,
-                            "usuario_responsable": usuario_actual, # Guarda el funcionario
-                            "fecha_entrega": datetime.now(chile_time).isoformat()
+                    # Alerta Roja: Alguien en esta casa ya recibió algo
+                    st.error(f"🛑 ALERTA DE DIRECCIÓN: En '{p['direccion']}' ya se entregó ayuda HOY.")
+                    st.dataframe(
+                        df_casa[['rut_beneficiario', 'item', 'centro_acopio', 'fecha_entrega']],
+                        hide_index=True,
+                        column_config={
+                            "rut_beneficiario": "RUT que retiró",
+                            "fecha_entrega": st.column_config.DatetimeColumn("Hora", format="HH:mm")
                         }
-                        supabase.table("entregas").insert(datos_entrega).execute()
-                        st.toast(f"✅ Entregado: {final_item}")
-                        time.sleep(1)
-                        st.rerun()
+                    )
+
+            except Exception as e:
+                # Si falla la validación cruzada no bloqueamos el sistema, pero el funcionario debe saberlo
+                st.warning(f"⚠️ No se pudo revisar si este hogar ya recibió ayuda hoy: {e}")
 
 
 # --- SECCIÓN DE ESTADÍSTICAS (SOLO ADMINISTRADORES) ---
@@ -218,43 +408,74 @@ with st.expander("📊 Ver Estadísticas y Reportes (Solo Jefes)"):
     if clave_admin == "penco2026": 
         st.success("Acceso concedido")
         
-        # 1. Cargar TODOS los datos de entregas
-        # OJO: Si son miles de datos, esto se puede optimizar después, 
-        # pero para la emergencia funciona bien.
-        datos_globales = supabase.table("entregas").select("*").execute()
-        df_global = pd.DataFrame(datos_globales.data)
+        # 1. Estadísticas ya agregadas en la base de datos (se refrescan cada minuto)
+        stats = estadisticas(supabase, cache)
         
-        if not df_global.empty:
-            # Convertir fecha
-            df_global['fecha_entrega'] = pd.to_datetime(df_global['fecha_entrega']).dt.tz_convert(chile_time)
-            
+        if stats["por_centro"]:
             # A. TOTAL POR CENTRO DE ACOPIO
             st.subheader("📍 Entregas por Centro de Acopio")
-            conteo_centros = df_global['centro_acopio'].value_counts()
+            conteo_centros = pd.DataFrame(stats["por_centro"]).set_index('centro_acopio')['entregas']
             st.bar_chart(conteo_centros)
             
             # B. RANKING DE FAMILIAS CON MÁS AYUDA
             st.subheader("🏆 Familias con mayor cantidad de retiros")
-            # Agrupamos por RUT y contamos cuántas veces aparece
-            top_familias = df_global['rut_beneficiario'].value_counts().head(10)
+            top_familias = pd.DataFrame(stats["top_familias"]).set_index('rut_beneficiario')['retiros']
             st.table(top_familias.rename("Cantidad de Retiros"))
             
             # C. TOTAL DE INSUMOS ENTREGADOS
             st.subheader("📦 Total de Insumos Entregados (Global)")
-            total_items = df_global.groupby('item')['cantidad'].sum().sort_values(ascending=False)
+            total_items = pd.DataFrame(stats["por_item"]).set_index('item')['total'].rename("cantidad")
             st.dataframe(total_items, use_container_width=True)
             
-            # D. DESCARGAR REPORTE EXCEL
-            # Convertir el DataFrame a CSV para descargar
-            csv = df_global.to_csv(index=False).encode('utf-8')
+            # D. DESCARGAR REPORTE COMPLETO (paginado, se arma recién al hacer clic)
+            st.subheader("📥 Reporte de Entregas")
+            f1, f2, f3 = st.columns([2, 2, 2])
+            rango = f1.date_input("Fechas (desde - hasta)", value=[], format="DD-MM-YYYY")
+            filtro_centro = f2.selectbox("Centro", ["Todos"] + centros_acopio(supabase, cache))
+            filtro_item = f3.selectbox("Ayuda", ["Todas"] + catalogo(supabase, cache))
+            f4, f5 = st.columns([2, 2])
+            con_ficha = f4.checkbox("Incluir nombre, sector y dirección del beneficiario")
+            formato = f5.radio("Formato", ["csv", "xlsx"], horizontal=True)
+            
+            filtros = {
+                "desde": rango[0] if len(rango) > 0 else None,
+                "hasta": rango[-1] if len(rango) > 0 else None,
+                "centro": None if filtro_centro == "Todos" else filtro_centro,
+                "item": None if filtro_item == "Todas" else filtro_item,
+            }
             st.download_button(
-                "📥 Descargar Reporte Completo (CSV)",
-                data=csv,
-                file_name="reporte_entregas_penco.csv",
-                mime="text/csv"
+                "📥 Descargar Reporte Completo",
+                data=partial(generar_reporte, supabase, formato, con_ficha, **filtros),
+                file_name=f"reporte_entregas_penco.{formato}",
+                mime="text/csv" if formato == "csv" else
+                     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
             
         else:
             st.info("Aún no hay datos de entregas para generar reportes.")
+        
+        # E. USO DE LA CACHE DE REFERENCIAS
+        st.subheader("🗂️ Cache de datos de referencia")
+        st.dataframe(pd.DataFrame(cache.estadisticas()).T, use_container_width=True)
+        if st.button("Vaciar cache"):
+            cache.invalidar()
+        
+        # F. TIEMPOS DE LAS CONSULTAS A SUPABASE (desde que se levantó el servidor)
+        st.subheader("⏱️ Consultas a la base de datos")
+        tipos = registro.por_tipo()
+        if tipos:
+            st.dataframe(pd.DataFrame(tipos), use_container_width=True, hide_index=True)
+            st.write("**Errores por centro**")
+            st.dataframe(pd.DataFrame(registro.por_centro()), use_container_width=True, hide_index=True)
+            lentas = registro.lentas()
+            if lentas:
+                st.write(f"**Consultas lentas (más de {registro.umbral_lenta:g} s)**")
+                st.dataframe(pd.DataFrame(lentas), use_container_width=True, hide_index=True)
+            errores = registro.errores()
+            if errores:
+                st.write("**Últimos errores**")
+                st.dataframe(pd.DataFrame(errores), use_container_width=True, hide_index=True)
+        else:
+            st.info("Aún no hay consultas registradas.")
     elif clave_admin:
         st.error("Clave incorrecta")                     
\ No newline at end of file
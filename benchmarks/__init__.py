@@ -0,0 +1 @@
+# Benchmarks de la aplicación (ver benchmarks/ejecutar.py)
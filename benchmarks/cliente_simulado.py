@@ -0,0 +1,404 @@
+# --- CLIENTE SUPABASE SIMULADO (usado por benchmarks/) ---
+# Imita en memoria la parte de supabase-py / PostgREST que usa la aplicación:
+# table().select/insert/upsert con filtros eq, in_, gt, gte, lt, lte, or_,
+# order y limit, las vistas de supabase/migrations y la función
+# buscar_beneficiario. Cada execute() es un viaje al servidor: se le suma una
+# latencia de red simulada y el tiempo de transferir los bytes de ida y vuelta.
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import pytz
+from postgrest.exceptions import APIError
+
+from normalizacion import clave_direccion
+
+chile_time = pytz.timezone('America/Santiago')
+
+LATENCIA = 0.03          # segundos de ida y vuelta por consulta
+ANCHO_BANDA = 5_000_000  # bytes por segundo
+MAX_FILAS = 1000         # tope de filas por respuesta de PostgREST (max_rows de Supabase)
+
+# Tablas con sus llaves e índices, como quedan después de supabase/migrations
+ESQUEMA = {
+    "beneficiarios": {"llave": "rut", "indices": ["direccion_clave"]},
+    "entregas": {"llave": "id", "unicas": ["clave_idempotencia"], "indices": ["rut_beneficiario"]},
+    "catalogo_ayuda": {"llave": "nombre_item"},
+}
+RELACIONES = {("entregas", "beneficiarios"): "rut_beneficiario"}  # columna de entregas -> beneficiarios.rut
+COLUMNAS_FECHA = {"fecha_entrega", "fecha_registro"}
+
+
+class _Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+
+def _a_json(valor):
+    if isinstance(valor, datetime):
+        return valor.astimezone(timezone.utc).isoformat()
+    raise TypeError(type(valor))
+
+
+def _comparable(actual, valor):
+    # Los filtros llegan como texto (or_) o como el valor de Python; se comparan con el tipo de la columna
+    if isinstance(valor, str):
+        if isinstance(actual, datetime):
+            return datetime.fromisoformat(valor)
+        if isinstance(actual, bool):
+            return valor.lower() == "true"
+        if isinstance(actual, int):
+            return int(valor)
+        if isinstance(actual, float):
+            return float(valor)
+    return valor
+
+
+OPERADORES = {
+    "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+}
+
+
+def _condicion(columna, operador, valor):
+    comparar = OPERADORES[operador]
+
+    def cumple(fila):
+        actual = fila.get(columna)
+        # Como en SQL: una comparación con NULL nunca es verdadera
+        return actual is not None and comparar(actual, _comparable(actual, valor))
+    return cumple
+
+
+def _partir_terminos(texto):
+    """Separa 'a.eq.1,and(b.gt.2,c.lt.3)' en sus términos de primer nivel."""
+    terminos, actual, nivel, comillas = [], "", 0, False
+    for caracter in texto:
+        if caracter == '"':
+            comillas = not comillas
+        elif not comillas and caracter == "(":
+            nivel += 1
+        elif not comillas and caracter == ")":
+            nivel -= 1
+        elif not comillas and nivel == 0 and caracter == ",":
+            terminos.append(actual)
+            actual = ""
+            continue
+        actual += caracter
+    return terminos + [actual]
+
+
+def _expresion_logica(texto, todas=False):
+    """Condición para la sintaxis de or_ de PostgREST: or=(...) con and(...) anidados."""
+    condiciones = []
+    for termino in _partir_terminos(texto):
+        grupo = re.fullmatch(r"(and|or)\((.*)\)", termino.strip())
+        if grupo:
+            condiciones.append(_expresion_logica(grupo.group(2), todas=grupo.group(1) == "and"))
+        else:
+            columna, operador, valor = termino.strip().split(".", 2)
+            condiciones.append(_condicion(columna, operador, valor.strip('"')))
+    junta = all if todas else any
+    return lambda fila: junta(c(fila) for c in condiciones)
+
+
+def _columnas(texto):
+    """'a, b, beneficiarios(x, y)' -> (['a', 'b'], {'beneficiarios': ['x', 'y']}); '*' -> (None, {})."""
+    embebidas = {nombre: [c.strip() for c in cols.split(",")]
+                 for nombre, cols in re.findall(r"(\w+)\(([^)]*)\)", texto)}
+    resto = [c.strip() for c in re.sub(r"\w+\([^)]*\)", "", texto).split(",") if c.strip()]
+    return (None if resto in ([], ["*"]) else resto), embebidas
+
+
+class _Tabla:
+    def __init__(self, llave, unicas=(), indices=()):
+        self.llave = llave
+        self.filas = {}                                         # llave -> fila
+        self.unicas = {c: {} for c in unicas}                   # columna -> valor -> llave
+        self.indices = {c: defaultdict(set) for c in indices}   # columna -> valor -> {llaves}
+        self.siguiente_id = 1
+
+    def _indexar(self, fila, quitar=False):
+        llave = fila[self.llave]
+        for columna, valores in self.unicas.items():
+            if fila.get(columna) is not None:
+                if quitar:
+                    valores.pop(fila[columna], None)
+                else:
+                    valores[fila[columna]] = llave
+        for columna, valores in self.indices.items():
+            if quitar:
+                valores[fila.get(columna)].discard(llave)
+            else:
+                valores[fila.get(columna)].add(llave)
+
+    def buscar(self, columna, valor):
+        if columna == self.llave:
+            return self.filas.get(valor)
+        llave = self.unicas[columna].get(valor)
+        return self.filas.get(llave) if llave is not None else None
+
+    def candidatas(self, pistas):
+        """Filas a revisar, usando el primer filtro eq/in_ que tenga índice."""
+        for columna, valores in pistas:
+            if columna == self.llave:
+                return [self.filas[v] for v in valores if v in self.filas]
+            if columna in self.unicas:
+                return [self.filas[self.unicas[columna][v]] for v in valores if v in self.unicas[columna]]
+            if columna in self.indices:
+                return [self.filas[llave] for v in valores for llave in self.indices[columna].get(v, ())]
+        return list(self.filas.values())
+
+    def preparar(self, registro):
+        fila = {c: (datetime.fromisoformat(v) if c in COLUMNAS_FECHA and isinstance(v, str) else v)
+                for c, v in registro.items()}
+        if "direccion" in fila:
+            # Lo que hace el trigger beneficiarios_direccion_clave de la base de datos
+            fila["direccion_clave"] = clave_direccion(fila["direccion"])
+        if self.llave == "id" and fila.get("id") is None:
+            fila["id"] = self.siguiente_id
+            self.siguiente_id += 1
+        return fila
+
+    def guardar(self, fila):
+        anterior = self.filas.get(fila[self.llave])
+        if anterior is not None:
+            self._indexar(anterior, quitar=True)
+        self.filas[fila[self.llave]] = fila
+        self._indexar(fila)
+
+
+class _Consulta:
+    """Constructor de consultas con la misma forma que el de postgrest-py."""
+
+    def __init__(self, cliente, tabla):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._operacion = "select"
+        self._columnas = "*"
+        self._condiciones = []
+        self._pistas = []       # (columna, valores) de los filtros eq/in_, para usar índices
+        self._orden = []
+        self._limite = None
+        self._registros = None
+        self._conflicto = None
+        self._ignorar = False
+
+    def select(self, columnas="*", **_):
+        self._operacion, self._columnas = "select", columnas
+        return self
+
+    def insert(self, registros, **_):
+        self._operacion = "insert"
+        self._registros = registros if isinstance(registros, list) else [registros]
+        return self
+
+    def upsert(self, registros, on_conflict=None, ignore_duplicates=False, **_):
+        self.insert(registros)
+        self._operacion, self._conflicto, self._ignorar = "upsert", on_conflict, ignore_duplicates
+        return self
+
+    def _filtro(self, columna, operador, valor):
+        self._condiciones.append(_condicion(columna, operador, valor))
+        if operador == "eq":
+            self._pistas.append((columna, [valor]))
+        return self
+
+    def eq(self, columna, valor): return self._filtro(columna, "eq", valor)
+    def neq(self, columna, valor): return self._filtro(columna, "neq", valor)
+    def gt(self, columna, valor): return self._filtro(columna, "gt", valor)
+    def gte(self, columna, valor): return self._filtro(columna, "gte", valor)
+    def lt(self, columna, valor): return self._filtro(columna, "lt", valor)
+    def lte(self, columna, valor): return self._filtro(columna, "lte", valor)
+
+    def in_(self, columna, valores):
+        valores = list(valores)
+        conjunto = set(valores)
+        self._condiciones.append(lambda fila: fila.get(columna) in conjunto)
+        self._pistas.append((columna, valores))
+        return self
+
+    def or_(self, filtros, **_):
+        self._condiciones.append(_expresion_logica(filtros))
+        return self
+
+    def order(self, columna, desc=False, **_):
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, cantidad, **_):
+        self._limite = cantidad
+        return self
+
+    def execute(self):
+        return self._cliente._viaje(self._registros, self._ejecutar)
+
+    def _ejecutar(self):
+        if self._operacion == "select":
+            return self._seleccionar()
+        return self._escribir()
+
+    def _seleccionar(self):
+        c = self._cliente
+        if self._tabla in c.VISTAS:
+            filas = c.VISTAS[self._tabla](c)
+        else:
+            filas = c.tablas[self._tabla].candidatas(self._pistas)
+        filas = [f for f in filas if all(cond(f) for cond in self._condiciones)]
+        for columna, desc in reversed(self._orden):
+            filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+        filas = filas[:min(self._limite or MAX_FILAS, MAX_FILAS)]
+
+        columnas, embebidas = _columnas(self._columnas)
+        salida = []
+        for fila in filas:
+            plana = dict(fila) if columnas is None else {col: fila.get(col) for col in columnas}
+            for relacion, cols in embebidas.items():
+                relacionada = c.tablas[relacion].filas.get(fila.get(RELACIONES[(self._tabla, relacion)]))
+                plana[relacion] = ({col: relacionada.get(col) for col in cols}
+                                   if relacionada is not None else None)
+            salida.append(plana)
+        return salida
+
+    def _escribir(self):
+        tabla = self._cliente.tablas[self._tabla]
+        columna = self._conflicto or tabla.llave
+        filas = [tabla.preparar(r) for r in self._registros]
+
+        # Como Postgres, el lote entero falla o se guarda entero
+        vistas = set()
+        for fila in filas:
+            for col in [tabla.llave, *tabla.unicas]:
+                valor = fila.get(col)
+                if valor is None:
+                    continue
+                if (col, valor) in vistas and self._operacion == "upsert" and not self._ignorar:
+                    raise APIError({"code": "21000", "message": "ON CONFLICT DO UPDATE command cannot "
+                                                                "affect row a second time"})
+                if (col, valor) in vistas and self._operacion == "insert":
+                    raise APIError({"code": "23505", "message": f"duplicate key value violates unique "
+                                                                f"constraint ({col})"})
+                vistas.add((col, valor))
+                if tabla.buscar(col, valor) is not None and (self._operacion == "insert" or col != columna):
+                    raise APIError({"code": "23505", "message": f"duplicate key value violates unique "
+                                                                f"constraint ({col})"})
+
+        escritas = []
+        for fila in filas:
+            existente = tabla.buscar(columna, fila.get(columna)) if self._operacion == "upsert" else None
+            if existente is not None:
+                if self._ignorar:
+                    continue
+                fila = {**existente, **fila, tabla.llave: existente[tabla.llave]}
+            tabla.guardar(fila)
+            escritas.append(dict(fila))
+        return escritas
+
+
+class _Rpc:
+    def __init__(self, cliente, nombre, parametros):
+        self._cliente, self._nombre, self._parametros = cliente, nombre, parametros
+
+    def execute(self):
+        funcion = self._cliente.FUNCIONES.get(self._nombre)
+        if funcion is None or not self._cliente.con_rpc:
+            raise APIError({"code": "PGRST202", "message": f"Could not find the function public.{self._nombre}"})
+        return self._cliente._viaje(self._parametros, lambda: funcion(self._cliente, **self._parametros))
+
+
+class ClienteSimulado:
+    """Reemplazo en memoria de supabase.Client para medir la aplicación sin red.
+
+    con_rpc=False simula un proyecto sin la migración de buscar_beneficiario.
+    """
+
+    def __init__(self, latencia=LATENCIA, ancho_banda=ANCHO_BANDA, con_rpc=True):
+        self.latencia = latencia
+        self.ancho_banda = ancho_banda
+        self.con_rpc = con_rpc
+        self.tablas = {nombre: _Tabla(**config) for nombre, config in ESQUEMA.items()}
+        self._candado = threading.RLock()
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def rpc(self, nombre, parametros=None):
+        return _Rpc(self, nombre, parametros or {})
+
+    def cargar(self, tabla, registros):
+        """Carga inicial directa, sin latencia (para sembrar los datos del benchmark)."""
+        with self._candado:
+            destino = self.tablas[tabla]
+            for registro in registros:
+                destino.guardar(destino.preparar(registro))
+
+    def _viaje(self, envio, ejecutar):
+        # La respuesta pasa por JSON igual que en la red: no se comparten objetos con el servidor
+        with self._candado:
+            datos = json.dumps(ejecutar(), default=_a_json)
+        bytes_viaje = len(datos) + (len(json.dumps(envio, default=str)) if envio else 0)
+        time.sleep(self.latencia + bytes_viaje / self.ancho_banda)
+        return _Respuesta(json.loads(datos))
+
+    # --- Vistas (supabase/migrations/20261018000500 y 20261018000600) ---
+    def _v_entregas_por_centro(self):
+        conteo = Counter(e["centro_acopio"] for e in self.tablas["entregas"].filas.values())
+        return [{"centro_acopio": c, "entregas": n} for c, n in conteo.most_common()]
+
+    def _v_top_familias(self):
+        conteo = Counter(e["rut_beneficiario"] for e in self.tablas["entregas"].filas.values())
+        return [{"rut_beneficiario": r, "retiros": n} for r, n in conteo.most_common(10)]
+
+    def _v_totales_por_item(self):
+        totales = Counter()
+        for e in self.tablas["entregas"].filas.values():
+            totales[e["item"]] += e["cantidad"] or 0
+        return [{"item": i, "total": n} for i, n in totales.most_common()]
+
+    def _v_distintos(self, columna):
+        valores = {e.get(columna) for e in self.tablas["entregas"].filas.values()}
+        return [{columna: v} for v in sorted(v for v in valores if v)]
+
+    VISTAS = {
+        "v_entregas_por_centro": _v_entregas_por_centro,
+        "v_top_familias": _v_top_familias,
+        "v_totales_por_item": _v_totales_por_item,
+        "v_centros_acopio": lambda self: self._v_distintos("centro_acopio"),
+        "v_funcionarios": lambda self: self._v_distintos("usuario_responsable"),
+    }
+
+    # --- Función buscar_beneficiario (supabase/migrations/20261018000400) ---
+    def _buscar_beneficiario(self, p_rut):
+        beneficiarios, entregas = self.tablas["beneficiarios"], self.tablas["entregas"]
+        persona = beneficiarios.filas.get(p_rut)
+        if persona is None:
+            return {"persona": None, "ruts_hogar": [], "entregas_hoy_hogar": [], "historial": []}
+
+        clave = persona.get("direccion_clave") or clave_direccion(persona.get("direccion"))
+        vecinos = beneficiarios.indices["direccion_clave"].get(clave, ()) if clave else ()
+        ruts_hogar = sorted(set(vecinos) | {p_rut})
+        hoy = datetime.now(chile_time).date()
+        desde = chile_time.localize(datetime.combine(hoy, datetime.min.time()))
+        hasta = chile_time.localize(datetime.combine(hoy + timedelta(days=1), datetime.min.time()))
+        del_hogar = entregas.candidatas([("rut_beneficiario", ruts_hogar)])
+        return {
+            "persona": dict(persona),
+            "ruts_hogar": ruts_hogar,
+            "entregas_hoy_hogar": sorted(
+                ({c: e.get(c) for c in ("rut_beneficiario", "item", "centro_acopio", "fecha_entrega",
+                                        "clave_idempotencia")}
+                 for e in del_hogar if desde <= e["fecha_entrega"] < hasta),
+                key=lambda e: e["fecha_entrega"]),
+            "historial": sorted((dict(e) for e in entregas.candidatas([("rut_beneficiario", [p_rut])])),
+                                key=lambda e: e["fecha_entrega"], reverse=True),
+        }
+
+    def _refrescar_estadisticas(self):
+        return None  # aquí las vistas se calculan en cada lectura
+
+    FUNCIONES = {"buscar_beneficiario": _buscar_beneficiario,
+                 "refrescar_estadisticas": _refrescar_estadisticas}
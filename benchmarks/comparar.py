@@ -0,0 +1,63 @@
+# --- COMPARACIÓN DE DOS CORRIDAS DEL BENCHMARK ---
+#   python -m benchmarks.comparar benchmarks/resultados/antes.json benchmarks/resultados/despues.json
+# Muestra cada métrica de ambas corridas y marca las que empeoraron más que el umbral.
+# Termina con código 1 si hubo alguna, para poder usarlo antes de publicar un cambio.
+import argparse
+import json
+import sys
+
+# Métrica -> True si un valor más alto es mejor
+METRICAS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "viajes_por_op": False,
+    "kb_por_op": False,
+    "memoria_pico_mb": False,
+    "filas_por_s": True,
+}
+
+
+def comparar(anterior, nuevo, umbral=10.0):
+    """Filas (tamaño, escenario, métrica, antes, después, cambio %, empeoró)."""
+    filas = []
+    for tamano, escenarios in nuevo["resultados"].items():
+        previos = anterior["resultados"].get(tamano, {})
+        for escenario, valores in escenarios.items():
+            if not isinstance(valores, dict) or not isinstance(previos.get(escenario), dict):
+                continue
+            for metrica, mas_es_mejor in METRICAS.items():
+                antes, despues = previos[escenario].get(metrica), valores.get(metrica)
+                if antes is None or despues is None:
+                    continue
+                cambio = (despues - antes) / antes * 100 if antes else 0.0
+                empeoro = (-cambio if mas_es_mejor else cambio) > umbral
+                filas.append((tamano, escenario, metrica, antes, despues, cambio, empeoro))
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dos reportes de benchmarks/ejecutar.py.")
+    parser.add_argument("anterior")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=10.0, help="porcentaje tolerado antes de marcar")
+    args = parser.parse_args(argv)
+
+    with open(args.anterior, encoding="utf-8") as f:
+        anterior = json.load(f)
+    with open(args.nuevo, encoding="utf-8") as f:
+        nuevo = json.load(f)
+    if anterior.get("parametros") != nuevo.get("parametros"):
+        print("Aviso: las corridas usaron parámetros distintos; la comparación puede no ser justa.")
+
+    print(f"{anterior.get('commit')} -> {nuevo.get('commit')}")
+    filas = comparar(anterior, nuevo, args.umbral)
+    for tamano, escenario, metrica, antes, despues, cambio, empeoro in filas:
+        marca = "  ▲ peor" if empeoro else ""
+        print(f"{tamano:>9} {escenario:<22}{metrica:<17}{antes:>11}{despues:>11}{cambio:>+9.1f}%{marca}")
+    peores = sum(f[-1] for f in filas)
+    print(f"\n{peores} métricas empeoraron más de {args.umbral:g}%.")
+    return 1 if peores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
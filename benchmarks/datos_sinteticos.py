@@ -0,0 +1,168 @@
+# --- DATOS SINTÉTICOS PARA LOS BENCHMARKS ---
+# Padrón con RUT válidos (dígito verificador módulo 11) y hogares de varias
+# personas con la dirección escrita de distintas formas, más entregas de los
+# últimos días (incluidas algunas de hoy, para que salte la alerta de dirección).
+# Todo sale de una semilla: dos corridas con la misma semilla dan los mismos datos.
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from normalizacion import clave_direccion, digito_verificador, formatear_rut
+
+chile_time = pytz.timezone('America/Santiago')
+
+NOMBRES = ["María", "José", "Juan", "Ana", "Luis", "Carmen", "Pedro", "Rosa", "Jorge", "Patricia",
+           "Francisco", "Claudia", "Carlos", "Sandra", "Manuel", "Marcela", "Víctor", "Verónica",
+           "Héctor", "Paola", "Sebastián", "Camila", "Matías", "Javiera", "Benjamín", "Constanza"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez",
+             "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya",
+             "Flores", "Espinoza", "Valenzuela", "Castillo", "Tapia", "Reyes", "Gutiérrez", "Castro"]
+CALLES = ["Los Carrera", "Freire", "O'Higgins", "Penco", "Las Heras", "Maipú", "Yerbas Buenas",
+          "Cochrane", "Talcahuano", "Alcázar", "Baquedano", "Infante", "Roble", "Membrillar",
+          "Pasaje Los Aromos", "Villa Las Playas", "Lord Cochrane", "Gaete", "Blanco Encalada"]
+SECTORES = ["Centro", "Playa Negra", "Lirquén", "Cerro Verde", "Villa Los Ríos", "Penco Chico",
+            "Las Canchas", "Cosmito"]
+ITEMS = ["Agua", "Caja de Alimentos", "Pañales", "Frazadas", "Kit de Aseo", "Colchón",
+         "Ropa", "Leche", "Útiles Escolares", "Mascarillas"]
+CENTROS = ["Liceo Pencopolitano", "Gimnasio Municipal", "Sede Lirquén", "Escuela Cerro Verde",
+           "Parroquia San Vicente"]
+FUNCIONARIOS = [f"Funcionario Turno {i}" for i in range(1, 13)]
+
+# Formas en que se escribe una misma dirección (todas dan la misma clave_direccion)
+FORMAS_DIRECCION = ["{calle} {numero}", "{calle_mayus} #{numero}", "{calle_minus} n° {numero}",
+                    "{calle}, Nº{numero}", "  {calle}  {numero} "]
+
+
+def generar_ruts(cantidad, rng):
+    """RUT únicos y válidos, limpios como limpiar_rut ("12345678K")."""
+    cuerpos = np.unique(rng.integers(3_000_000, 27_000_000, int(cantidad * 1.1) + 10))
+    while len(cuerpos) < cantidad:
+        cuerpos = np.unique(np.concatenate([cuerpos, rng.integers(3_000_000, 27_000_000, cantidad)]))
+    cuerpos = rng.permutation(cuerpos)[:cantidad]
+    return [f"{c}{digito_verificador(c)}" for c in cuerpos]
+
+
+def generar_padron(cantidad, rng):
+    """DataFrame de beneficiarios con las columnas de la tabla (hogares de 1 a 6 personas)."""
+    ruts = generar_ruts(cantidad, rng)
+    tamanos = rng.choice([1, 2, 3, 4, 5, 6], size=cantidad, p=[0.35, 0.25, 0.18, 0.12, 0.07, 0.03])
+    hogar = np.repeat(np.arange(cantidad), tamanos)[:cantidad]
+    integrantes = np.bincount(hogar)[hogar]
+
+    # Cada hogar: una calle y un número; cada integrante la escribe a su manera
+    calles = rng.integers(0, len(CALLES), hogar.max() + 1)[hogar]
+    numeros = rng.integers(1, 3000, hogar.max() + 1)[hogar]
+    formas = rng.integers(0, len(FORMAS_DIRECCION), cantidad)
+    direcciones = [
+        FORMAS_DIRECCION[f].format(calle=CALLES[c], calle_mayus=CALLES[c].upper(),
+                                   calle_minus=CALLES[c].lower(), numero=n)
+        for c, n, f in zip(calles, numeros, formas)]
+
+    nombres = [f"{NOMBRES[a]} {APELLIDOS[b]} {APELLIDOS[c]}" for a, b, c in
+               rng.integers(0, [len(NOMBRES), len(APELLIDOS), len(APELLIDOS)], (cantidad, 3))]
+    ahora = datetime.now(chile_time)
+    return pd.DataFrame({
+        "rut": ruts,
+        "nombre": nombres,
+        "direccion": direcciones,
+        "direccion_clave": [clave_direccion(d) for d in direcciones],
+        "sector": np.array(SECTORES)[rng.integers(0, len(SECTORES), hogar.max() + 1)[hogar]],
+        "cant_familia": integrantes,
+        "afectado": rng.random(cantidad) < 0.9,
+        "fecha_registro": (ahora - timedelta(days=30)).isoformat(),
+    })
+
+
+def generar_entregas(padron, cantidad, rng, dias=30):
+    """DataFrame de entregas de los últimos 'dias' días; un 5% son de hoy."""
+    # Algunas familias retiran mucho más que otras (como en el ranking del panel)
+    pesos = rng.pareto(1.5, len(padron)) + 1
+    ruts = rng.choice(padron["rut"].to_numpy(), size=cantidad, p=pesos / pesos.sum())
+    ahora = datetime.now(chile_time)
+    inicio_hoy = ahora.replace(hour=0, minute=0, second=0, microsecond=0)
+    segundos_hoy = max((ahora - inicio_hoy).total_seconds(), 1)
+    de_hoy = rng.random(cantidad) < 0.05
+    atras = np.where(de_hoy, rng.uniform(0, segundos_hoy, cantidad),
+                     segundos_hoy + rng.uniform(0, dias * 86400, cantidad))
+    return pd.DataFrame({
+        "rut_beneficiario": ruts,
+        "item": np.array(ITEMS)[rng.integers(0, len(ITEMS), cantidad)],
+        "cantidad": rng.integers(1, 6, cantidad),
+        "centro_acopio": np.array(CENTROS)[rng.integers(0, len(CENTROS), cantidad)],
+        "usuario_responsable": np.array(FUNCIONARIOS)[rng.integers(0, len(FUNCIONARIOS), cantidad)],
+        "fecha_entrega": [(ahora - timedelta(seconds=float(s))).isoformat() for s in atras],
+    })
+
+
+def registros(df):
+    """Filas del DataFrame como dicts con tipos de Python (listos para JSON)."""
+    return df.astype(object).to_dict("records")
+
+
+# ==========================================
+# ARCHIVOS PARA LA CARGA MASIVA
+# ==========================================
+class ArchivoSubido(io.BytesIO):
+    """Lo mismo que entrega st.file_uploader: bytes en memoria con nombre."""
+
+    def __init__(self, contenido, nombre):
+        super().__init__(contenido)
+        self.name = nombre
+
+
+def _a_archivo(df, nombre, formato):
+    if formato == "csv":
+        return ArchivoSubido(df.to_csv(index=False).encode("utf-8"), f"{nombre}.csv")
+    destino = io.BytesIO()
+    df.to_excel(destino, index=False)
+    return ArchivoSubido(destino.getvalue(), f"{nombre}.xlsx")
+
+
+def archivo_personas(padron, cantidad, rng, formato="csv", existentes=0.3, repetidos=0.02):
+    """Planilla del padrón: una parte son RUT ya cargados (actualizaciones) y algunos se repiten."""
+    cantidad_existentes = min(int(cantidad * existentes), len(padron))
+    nuevos = generar_padron(cantidad - cantidad_existentes, rng)
+    # Evita chocar por azar con los RUT del padrón sembrado
+    nuevos = nuevos[~nuevos["rut"].isin(set(padron["rut"]))]
+    filas = pd.concat([padron.sample(cantidad_existentes, random_state=rng.integers(2**31)), nuevos])
+    filas = pd.concat([filas, filas.sample(int(len(filas) * repetidos), random_state=rng.integers(2**31))])
+    filas = filas.sample(frac=1, random_state=rng.integers(2**31))
+    df = pd.DataFrame({
+        "RUT": filas["rut"].map(formatear_rut),
+        "Nombre Completo": filas["nombre"],
+        "Dirección": filas["direccion"],
+        "Integrantes": filas["cant_familia"],
+        "Sector": filas["sector"],
+    })
+    return _a_archivo(df, "padron_benchmark", formato)
+
+
+COLUMNAS_PERSONAS = dict(c_rut="RUT", c_nom="Nombre Completo", c_dir="Dirección",
+                         c_fam="Integrantes", c_sec="Sector")
+
+
+def archivo_entregas(padron, cantidad, rng, formato="csv", desconocidos=0.03, invalidas=0.02):
+    """Planilla de entregas históricas, con algunos RUT que no están en el padrón y filas malas."""
+    entregas = generar_entregas(padron, cantidad, rng)
+    fechas = pd.to_datetime(entregas["fecha_entrega"], format="ISO8601").dt.tz_convert(chile_time)
+    df = pd.DataFrame({
+        "RUT": entregas["rut_beneficiario"].map(formatear_rut),
+        "Item": entregas["item"],
+        "Cantidad": entregas["cantidad"].astype(object),
+        "Fecha": fechas.dt.strftime("%d-%m-%Y %H:%M"),
+        "Centro": entregas["centro_acopio"],
+    })
+    sin_ficha = rng.random(cantidad) < desconocidos
+    df.loc[sin_ficha, "RUT"] = [formatear_rut(r) for r in generar_ruts(int(sin_ficha.sum()), rng)]
+    malas = np.flatnonzero(rng.random(cantidad) < invalidas)
+    df.loc[malas[0::3], "Cantidad"] = 0
+    df.loc[malas[1::3], "Fecha"] = "31-02-2024"
+    df.loc[malas[2::3], "Item"] = None
+    return _a_archivo(df, "entregas_benchmark", formato)
+
+
+COLUMNAS_ENTREGAS = dict(c_rut="RUT", c_item="Item", c_cant="Cantidad", c_fecha="Fecha",
+                         c_centro="Centro")
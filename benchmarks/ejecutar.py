@@ -0,0 +1,269 @@
+# --- BENCHMARK DE BÚSQUEDA, ESTADÍSTICAS Y CARGA MASIVA ---
+# Mide los caminos calientes de app.py y carga_masiva.py con padrones sintéticos
+# de distintos tamaños: viajes al servidor, bytes, percentiles de latencia y
+# memoria. Deja un JSON por corrida para comparar versiones (benchmarks/comparar.py).
+#
+# Desde la raíz del repositorio:
+#   python -m benchmarks.ejecutar                          # 10.000 personas, cliente simulado
+#   python -m benchmarks.ejecutar --tamanos 10000 100000 1000000
+#   python -m benchmarks.ejecutar --url http://localhost:54321 --key <anon key>
+#
+# Con --url se usa un Supabase/PostgREST de verdad (por ejemplo el local de
+# `supabase start` con supabase/migrations aplicadas). El benchmark SIEMPRE
+# escribe datos sintéticos: úsalo solo contra una base de datos desechable.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import datos_sinteticos as sint
+from benchmarks.cliente_simulado import ANCHO_BANDA, LATENCIA, ClienteSimulado
+from cache_ttl import CacheTTL
+from consultas import _buscar_beneficiario_por_partes, buscar_beneficiario, buscar_hogar, entregas_hoy_hogar, estadisticas
+from importador import TAMANO_LOTE, importar_entregas, importar_personas, leer_en_bloques, partir_en_lotes
+from instrumentacion import ClienteInstrumentado
+from normalizacion import clave_direccion
+from reintentos import enviar_con_reintentos
+from trabajos import hash_archivo
+
+VERSION_REPORTE = 1
+CARPETA_RESULTADOS = os.path.join("benchmarks", "resultados")
+
+
+# ==========================================
+# MEDICIÓN DE VIAJES AL SERVIDOR (con instrumentacion.ClienteInstrumentado)
+# ==========================================
+class Medidor:
+    """Registro para ClienteInstrumentado que guarda todas las mediciones del escenario.
+
+    A diferencia de RegistroConsultas no tiene ventana: los percentiles salen de todos los viajes.
+    """
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._candado:
+            self.viajes, self.bytes, self.latencias = 0, 0, []
+
+    def registrar(self, tipo, centro, segundos, filas=0, bytes_=0, error=None):
+        with self._candado:
+            self.viajes += 1
+            self.bytes += bytes_
+            self.latencias.append(segundos)
+
+
+def _ms(segundos):
+    return round(float(segundos) * 1000, 2)
+
+
+def percentiles(segundos, prefijo=""):
+    if not segundos:
+        return {}
+    p50, p95, p99 = np.percentile(segundos, [50, 95, 99])
+    return {f"{prefijo}p50_ms": _ms(p50), f"{prefijo}p95_ms": _ms(p95),
+            f"{prefijo}p99_ms": _ms(p99), f"{prefijo}max_ms": _ms(max(segundos))}
+
+
+def medir(cliente, operacion, entradas, memoria=True):
+    """Corre operacion(entrada) para cada entrada y resume tiempos, viajes, bytes y memoria."""
+    medidor = cliente.registro
+    medidor.reiniciar()
+    if memoria:
+        tracemalloc.start()
+    tiempos, resultado = [], None
+    inicio = time.perf_counter()
+    for entrada in entradas:
+        t = time.perf_counter()
+        resultado = operacion(entrada)
+        tiempos.append(time.perf_counter() - t)
+    total = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] if memoria else None
+    if memoria:
+        tracemalloc.stop()
+
+    n = max(len(tiempos), 1)
+    return {
+        "operaciones": len(tiempos),
+        "total_s": round(total, 3),
+        **percentiles(tiempos),
+        "viajes_por_op": round(medidor.viajes / n, 2),
+        "kb_por_op": round(medidor.bytes / n / 1024, 2),
+        **percentiles(medidor.latencias, "viaje_"),
+        "memoria_pico_mb": round(pico / 2**20, 2) if pico is not None else None,
+    }, resultado
+
+
+# ==========================================
+# ESCENARIOS
+# ==========================================
+def sembrar(cliente, padron, entregas, tamano=1000):
+    """Carga el padrón, las entregas y el catálogo en la base de datos del benchmark."""
+    catalogo = [{"nombre_item": i} for i in sint.ITEMS]
+    if isinstance(cliente, ClienteSimulado):
+        cliente.cargar("beneficiarios", sint.registros(padron))
+        cliente.cargar("entregas", sint.registros(entregas))
+        cliente.cargar("catalogo_ayuda", catalogo)
+        return
+    enviar_con_reintentos(lambda: cliente.table("catalogo_ayuda").upsert(catalogo).execute())
+    for tabla, datos in (("beneficiarios", padron), ("entregas", entregas)):
+        for lote in partir_en_lotes(sint.registros(datos), tamano):
+            enviar_con_reintentos(lambda: cliente.table(tabla).insert(lote).execute())
+
+
+def escenarios_de_consulta(cliente, padron, args, rng):
+    """Búsqueda del mostrador, alerta de hogar y panel de estadísticas."""
+    existentes = padron["rut"].sample(args.consultas, replace=True, random_state=rng.integers(2**31)).tolist()
+    # Un 10% de las búsquedas son RUT que no están (lleva al formulario de ficha nueva)
+    nuevos = sint.generar_ruts(max(args.consultas // 10, 1), rng)
+    ruts = [nuevos[i % len(nuevos)] if i % 10 == 9 else r for i, r in enumerate(existentes)]
+    personas = padron.sample(args.consultas, replace=True, random_state=rng.integers(2**31))
+
+    def revisar_hogar(direccion):
+        ruts_hogar = [v["rut"] for v in buscar_hogar(cliente, clave_direccion(direccion))]
+        return entregas_hoy_hogar(cliente, ruts_hogar) if ruts_hogar else []
+
+    resultados = {}
+    resultados["busqueda"], _ = medir(cliente, lambda r: buscar_beneficiario(cliente, r), ruts, args.memoria)
+    resultados["busqueda_por_partes"], _ = medir(
+        cliente, lambda r: _buscar_beneficiario_por_partes(cliente, r), ruts, args.memoria)
+    resultados["hogar"], _ = medir(cliente, revisar_hogar, personas["direccion"].tolist(), args.memoria)
+    # Cache nueva en cada vuelta: se mide la consulta a las vistas, no el acierto de cache
+    resultados["estadisticas"], _ = medir(
+        cliente, lambda _: estadisticas(cliente, CacheTTL()), range(args.repeticiones_estadisticas),
+        args.memoria)
+    return resultados
+
+
+def escenarios_de_carga(cliente, padron, args, rng):
+    """Las dos cargas de carga_masiva.py, leyendo el archivo por bloques como la página."""
+    cantidad = min(args.filas_importacion, len(padron) * 2)
+    resultados = {}
+
+    archivo = sint.archivo_personas(padron, cantidad, rng, args.formato)
+    medida, resumen = medir(cliente, lambda a: importar_personas(
+        cliente, leer_en_bloques(a), sint.COLUMNAS_PERSONAS, args.tamano_lote,
+        trabajadores=args.trabajadores), [archivo], args.memoria)
+    resultados["importar_personas"] = _resumen_carga(medida, resumen, cantidad)
+
+    archivo = sint.archivo_entregas(padron, cantidad, rng, args.formato)
+    medida, resumen = medir(cliente, lambda a: importar_entregas(
+        cliente, leer_en_bloques(a), sint.COLUMNAS_ENTREGAS, args.tamano_lote,
+        hash_archivo=hash_archivo(a), trabajadores=args.trabajadores), [archivo], args.memoria)
+    resultados["importar_entregas"] = _resumen_carga(medida, resumen, cantidad)
+    return resultados
+
+
+def _resumen_carga(medida, resumen, filas):
+    medida.update({
+        "filas": filas,
+        "filas_por_s": round(filas / medida["total_s"], 1) if medida["total_s"] else None,
+        "resumen": {k: v for k, v in resumen.items() if isinstance(v, (int, bool))},
+    })
+    return medida
+
+
+def correr_tamano(tamano, args):
+    rng = np.random.default_rng([args.semilla, tamano])
+    if args.url:
+        from supabase import create_client
+        base = create_client(args.url, args.key)
+    else:
+        base = ClienteSimulado(latencia=0, ancho_banda=float("inf"))
+
+    inicio = time.perf_counter()
+    padron = sint.generar_padron(tamano, rng)
+    entregas = sint.generar_entregas(padron, int(tamano * args.entregas_por_persona), rng)
+    sembrar(base, padron, entregas)
+    del entregas
+    preparacion = time.perf_counter() - inicio
+
+    # La latencia de red se activa recién después de sembrar
+    if isinstance(base, ClienteSimulado):
+        base.latencia, base.ancho_banda = args.latencia, args.ancho_banda
+    cliente = ClienteInstrumentado(base, Medidor())
+    resultados = {"preparacion_s": round(preparacion, 1)}
+    resultados.update(escenarios_de_consulta(cliente, padron, args, rng))
+    resultados.update(escenarios_de_carga(cliente, padron, args, rng))
+    return resultados
+
+
+# ==========================================
+# REPORTE
+# ==========================================
+def _git(*comando):
+    try:
+        return subprocess.run(["git", *comando], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadatos(args):
+    return {
+        "version_reporte": VERSION_REPORTE,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "cambios_sin_commit": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "entorno": {"python": platform.python_version(), "pandas": pd.__version__,
+                    "plataforma": platform.platform()},
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("key", "salida")},
+    }
+
+
+def imprimir(reporte):
+    for tamano, resultados in reporte["resultados"].items():
+        print(f"\n=== {int(tamano):,} personas ===".replace(",", "."))
+        print(f"{'escenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'viajes/op':>11}{'KB/op':>10}{'MB pico':>10}{'filas/s':>10}")
+        for nombre, r in resultados.items():
+            if not isinstance(r, dict):
+                continue
+            print(f"{nombre:<22}{r.get('p50_ms', ''):>10}{r.get('p95_ms', ''):>10}{r['viajes_por_op']:>11}"
+                  f"{r['kb_por_op']:>10}{r['memoria_pico_mb'] or '':>10}{r.get('filas_por_s') or '':>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda, estadísticas y carga masiva.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000], help="personas en el padrón")
+    parser.add_argument("--entregas-por-persona", type=float, default=2)
+    parser.add_argument("--consultas", type=int, default=200, help="búsquedas por escenario")
+    parser.add_argument("--repeticiones-estadisticas", type=int, default=5)
+    parser.add_argument("--filas-importacion", type=int, default=20_000)
+    parser.add_argument("--formato", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--trabajadores", type=int, default=4, help="envíos simultáneos de la carga")
+    parser.add_argument("--latencia", type=float, default=LATENCIA, help="segundos por viaje (simulado)")
+    parser.add_argument("--ancho-banda", type=float, default=ANCHO_BANDA, help="bytes/s (simulado)")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-memoria", dest="memoria", action="store_false",
+                        help="no medir memoria (tracemalloc hace más lentas las mediciones)")
+    parser.add_argument("--url", help="URL de un Supabase/PostgREST real (base de datos desechable)")
+    parser.add_argument("--key")
+    parser.add_argument("--salida", help="archivo JSON del reporte")
+    args = parser.parse_args(argv)
+
+    reporte = metadatos(args)
+    reporte["resultados"] = {}
+    for tamano in args.tamanos:
+        print(f"Corriendo con {tamano} personas...", flush=True)
+        reporte["resultados"][str(tamano)] = correr_tamano(tamano, args)
+
+    salida = args.salida or os.path.join(
+        CARPETA_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}-{reporte['commit'] or 'sin-git'}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    imprimir(reporte)
+    print(f"\nReporte guardado en {salida}")
+
+
+if __name__ == "__main__":
+    main()
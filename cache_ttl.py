@@ -0,0 +1,56 @@
+# --- CACHE CON VENCIMIENTO PARA DATOS DE REFERENCIA (usado por app.py) ---
+# Streamlit vuelve a correr todo el script en cada tecla o cambio de widget.
+# El catálogo, los centros y los funcionarios casi no cambian: se guardan en
+# memoria por unos minutos y se comparten entre todas las sesiones del servidor.
+import threading
+import time
+
+
+class CacheTTL:
+    """Guarda valores por clave durante 'ttl' segundos y cuenta aciertos y fallos."""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._valores = {}  # clave -> (vence, valor)
+        self._aciertos = {}
+        self._fallos = {}
+        self._candado = threading.Lock()
+
+    def obtener(self, clave, cargar, ttl=None):
+        """Devuelve el valor guardado o, si no hay o ya venció, lo carga con cargar().
+
+        ttl permite que una clave venza antes o después que el resto. Si cargar() falla
+        (por ejemplo, sin conexión) y hay un valor vencido, se devuelve ese.
+        """
+        with self._candado:
+            guardado = self._valores.get(clave)
+            if guardado and guardado[0] > time.monotonic():
+                self._aciertos[clave] = self._aciertos.get(clave, 0) + 1
+                return guardado[1]
+            self._fallos[clave] = self._fallos.get(clave, 0) + 1
+
+        # La carga va fuera del candado: una consulta lenta no bloquea a las demás claves
+        try:
+            valor = cargar()
+        except Exception:
+            if guardado:
+                return guardado[1]
+            raise
+        with self._candado:
+            self._valores[clave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+        return valor
+
+    def invalidar(self, clave=None):
+        """Descarta una clave (o todas) para que la próxima lectura vaya a la base de datos."""
+        with self._candado:
+            if clave is None:
+                self._valores.clear()
+            else:
+                self._valores.pop(clave, None)
+
+    def estadisticas(self):
+        """{clave: {"aciertos": n, "fallos": n}} desde que se levantó el servidor."""
+        with self._candado:
+            claves = set(self._aciertos) | set(self._fallos)
+            return {c: {"aciertos": self._aciertos.get(c, 0), "fallos": self._fallos.get(c, 0)}
+                    for c in sorted(claves)}
@@ -1,18 +1,27 @@
 import streamlit as st
 import pandas as pd
 from supabase import create_client
-from datetime import datetime
-import pytz
+import time
+
+from consultas import refrescar_estadisticas
+from importador import (TAMANO_LOTE, importar_entregas, importar_personas, leer_en_bloques,
+                        leer_muestra, saltar_filas)
+from instrumentacion import ClienteInstrumentado, RegistroConsultas
+from trabajos import buscar_trabajo, checkpoint, hash_archivo, marcar_terminado
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Importador Masivo - Penco", page_icon="📤", layout="centered")
-chile_time = pytz.timezone('America/Santiago')
+MAX_TRABAJADORES = 8  # envíos simultáneos como máximo, para no saturar Supabase
+
+# --- CONEXIÓN (cada consulta queda medida en el registro) ---
+@st.cache_resource
+def init_registro():
+    return RegistroConsultas()
 
-# --- CONEXIÓN ---
 try:
     url = st.secrets["supabase"]["url"]
     key = st.secrets["supabase"]["key"]
-    supabase = create_client(url, key)
+    supabase = ClienteInstrumentado(create_client(url, key), init_registro(), centro="Carga masiva")
 except:
     st.error("No se encontraron las claves en .streamlit/secrets.toml")
     st.stop()
@@ -25,6 +34,29 @@ modo = st.radio("¿Qué tipo de datos deseas subir hoy?",
 
 st.markdown("---")
 
+def muestra_del_archivo(archivo):
+    # Solo se leen las primeras filas, y una sola vez por archivo: el formulario
+    # de columnas no vuelve a parsear el archivo en cada interacción.
+    clave = f"muestra_{archivo.file_id}"
+    if clave not in st.session_state:
+        st.session_state[clave] = leer_muestra(archivo)
+    return st.session_state[clave]
+
+def trabajo_del_archivo(archivo, modo_trabajo):
+    # El hash se calcula una vez por archivo; el checkpoint se consulta en el SQLite local
+    clave = f"hash_{archivo.file_id}"
+    if clave not in st.session_state:
+        st.session_state[clave] = hash_archivo(archivo)
+    return st.session_state[clave], buscar_trabajo(st.session_state[clave], modo_trabajo)
+
+def avisar_trabajo_previo(trabajo):
+    if trabajo and trabajo["fila_confirmada"] > 0:
+        if trabajo["terminado"]:
+            st.info(f"ℹ️ Este archivo ya se cargó completo ({trabajo['exitos']} filas, {trabajo['actualizado']}).")
+        else:
+            st.warning(f"⏸️ Este archivo tiene una carga interrumpida: {trabajo['fila_confirmada']} filas "
+                       f"ya confirmadas ({trabajo['actualizado']}).")
+
 # ==========================================
 # MODO 1: CARGA DE PERSONAS (BENEFICIARIOS)
 # ==========================================
@@ -35,11 +67,13 @@ if modo == "👥 1. Cargar Padrón de Personas (Damnificados)":
     archivo = st.file_uploader("Sube Excel o CSV de PERSONAS", type=["xlsx", "xls", "csv"], key="file_personas")
     
     if archivo:
-        if archivo.name.endswith('csv'): df = pd.read_csv(archivo)
-        else: df = pd.read_excel(archivo)
+        df = muestra_del_archivo(archivo)
         
-        st.write(f"Previsualización ({len(df)} registros):")
+        st.write(f"Previsualización (primeras {len(df)} filas):")
         st.dataframe(df.head(3))
+        
+        hash_personas, trabajo = trabajo_del_archivo(archivo, "personas")
+        avisar_trabajo_previo(trabajo)
 
         with st.form("form_personas"):
             c1, c2 = st.columns(2)
@@ -50,33 +84,41 @@ if modo == "👥 1. Cargar Padrón de Personas (Damnificados)":
             c_fam = c4.selectbox("Columna GRUPO FAMILIAR", df.columns)
             c_sec = st.selectbox("Columna SECTOR (Opcional)", ["Ninguna"] + list(df.columns))
             
+            c5, c6 = st.columns(2)
+            tamano_lote = c5.number_input("Filas por lote (envío a Supabase)", 50, 2000, TAMANO_LOTE, step=50)
+            trabajadores = c6.number_input("Envíos simultáneos", 1, MAX_TRABAJADORES, 1,
+                                           help="Se reduce solo si Supabase responde que está saturado (429/5xx).")
+            retomar = st.checkbox("Retomar donde quedó la carga anterior de este archivo", value=True,
+                                  disabled=not trabajo)
+            
             if st.form_submit_button("🚀 SUBIR PERSONAS", type="primary"):
                 progreso = st.progress(0)
                 status = st.empty()
-                exitos, errores = 0, 0
                 
-                for i, row in df.iterrows():
-                    try:
-                        rut_limpio = str(row[c_rut]).replace(".", "").replace("-", "").strip().upper()
-                        try: fam = int(row[c_fam])
-                        except: fam = 1
-                        
-                        datos = {
-                            "rut": rut_limpio,
-                            "nombre": str(row[c_nom]).strip(),
-                            "direccion": str(row[c_dir]).strip(),
-                            "cant_familia": fam,
-                            "afectado": True
-                        }
-                        if c_sec != "Ninguna": datos["sector"] = str(row[c_sec])
-                        
-                        supabase.table("beneficiarios").upsert(datos).execute()
-                        exitos += 1
-                    except: errores += 1
-                    if i % 10 == 0: progreso.progress((i + 1) / len(df))
+                columnas = dict(c_rut=c_rut, c_nom=c_nom, c_dir=c_dir, c_fam=c_fam,
+                                c_sec=None if c_sec == "Ninguna" else c_sec)
+                
+                inicio = time.monotonic()
+                def avanzar(enviadas, avance):
+                    progreso.progress(avance)
+                    ritmo = enviadas / max(time.monotonic() - inicio, 0.001)
+                    status.text(f"Lote enviado: {enviadas} personas hasta ahora ({avance:.0%} del archivo leído) "
+                                f"· {ritmo:,.0f} filas/s")
+                
+                desde = trabajo["fila_confirmada"] if trabajo and retomar else 0
+                previos = trabajo["exitos"] if trabajo and retomar else 0
+                resumen = importar_personas(
+                    supabase, saltar_filas(leer_en_bloques(archivo), desde), columnas,
+                    int(tamano_lote), al_avanzar=avanzar,
+                    al_confirmar=checkpoint(hash_personas, "personas", archivo.name, previos),
+                    trabajadores=int(trabajadores))
+                if resumen["completo"]:
+                    marcar_terminado(hash_personas, "personas")
                 
                 progreso.progress(100)
-                st.success(f"✅ Personas cargadas: {exitos} | Errores: {errores}")
+                st.success(f"✅ Personas cargadas: {resumen['exitos']} | Errores: {resumen['errores']}")
+                if resumen["duplicados"] > 0:
+                    st.info(f"ℹ️ {resumen['duplicados']} filas tenían el RUT repetido en el archivo (se usó la última).")
 
 # ==========================================
 # MODO 2: CARGA DE ENTREGAS (HISTORIAL)
@@ -88,12 +130,14 @@ else:
     archivo_ent = st.file_uploader("Sube Excel o CSV de ENTREGAS", type=["xlsx", "xls", "csv"], key="file_entregas")
     
     if archivo_ent:
-        if archivo_ent.name.endswith('csv'): df_ent = pd.read_csv(archivo_ent)
-        else: df_ent = pd.read_excel(archivo_ent)
+        df_ent = muestra_del_archivo(archivo_ent)
         
-        st.write(f"Previsualización ({len(df_ent)} entregas):")
+        st.write(f"Previsualización (primeras {len(df_ent)} entregas):")
         st.dataframe(df_ent.head(3))
         
+        hash_entregas, trabajo = trabajo_del_archivo(archivo_ent, "entregas")
+        avisar_trabajo_previo(trabajo)
+        
         with st.form("form_entregas"):
             col1, col2, col3 = st.columns(3)
             c_rut_ent = col1.selectbox("Columna RUT Beneficiario", df_ent.columns)
@@ -116,58 +160,82 @@ else:
                 centro_fijo = col5.text_input("Si no trae centro, poner a todos:", "Carga Histórica Municipal")
 
             st.markdown("**Nota:** El 'Funcionario' quedará registrado como 'Administrador (Carga Masiva)'")
+            col6, col7 = st.columns(2)
+            tamano_lote_ent = col6.number_input("Filas por lote (envío a Supabase)", 50, 2000, TAMANO_LOTE, step=50)
+            trabajadores_ent = col7.number_input("Envíos simultáneos", 1, MAX_TRABAJADORES, 1,
+                                                 help="Se reduce solo si Supabase responde que está saturado (429/5xx).")
+            # Aunque se cargue desde el inicio, las entregas ya subidas de este archivo no se duplican
+            retomar = st.checkbox("Retomar donde quedó la carga anterior de este archivo", value=True,
+                                  disabled=not trabajo)
             
             if st.form_submit_button("🚀 SUBIR HISTORIAL DE ENTREGAS", type="primary"):
                 progreso = st.progress(0)
-                exitos, errores, ruts_no_encontrados = 0, 0, 0
+                status = st.empty()
                 
-                for i, row in df_ent.iterrows():
-                    try:
-                        rut_limpio = str(row[c_rut_ent]).replace(".", "").replace("-", "").strip().upper()
-                        
-                        # 1. Resolver Fecha
-                        if usar_fecha_col:
-                            fecha_str = str(row[c_fecha_ent])
-                            # Intentamos convertir fecha excel a formato ISO
-                            try:
-                                fecha_obj = pd.to_datetime(fecha_str)
-                                fecha_final = fecha_obj.isoformat()
-                            except:
-                                fecha_final = datetime.now().isoformat() # Fallback
-                        else:
-                            fecha_final = datetime.combine(fecha_fija, datetime.min.time()).isoformat()
-
-                        # 2. Resolver Centro
-                        if usar_centro_col:
-                            centro_final = str(row[c_centro_ent])
-                        else:
-                            centro_final = centro_fijo
-
-                        datos_entrega = {
-                            "rut_beneficiario": rut_limpio,
-                            "item": str(row[c_item_ent]),
-                            "cantidad": int(row[c_cant_ent]),
-                            "centro_acopio": centro_final,
-                            "fecha_entrega": fecha_final,
-                            "usuario_responsable": "Admin (Carga Masiva)"
-                        }
-                        
-                        supabase.table("entregas").insert(datos_entrega).execute()
-                        exitos += 1
-                        
-                    except Exception as e:
-                        # Si el error es de llave foránea (RUT no existe)
-                        if "foreign key constraint" in str(e).lower() or "violates foreign key" in str(e).lower():
-                            ruts_no_encontrados += 1
-                        else:
-                            errores += 1
-                            print(e)
-                    
-                    if i % 10 == 0: progreso.progress((i + 1) / len(df_ent))
+                # Cada bloque se valida contra Personas ANTES de insertar y se sube en lotes
+                columnas = dict(
+                    c_rut=c_rut_ent, c_item=c_item_ent, c_cant=c_cant_ent,
+                    c_fecha=c_fecha_ent if usar_fecha_col else None,
+                    fecha_fija=None if usar_fecha_col else fecha_fija,
+                    c_centro=c_centro_ent if usar_centro_col else None,
+                    centro_fijo=None if usar_centro_col else centro_fijo)
+                
+                inicio = time.monotonic()
+                def avanzar(enviadas, avance):
+                    progreso.progress(avance)
+                    ritmo = enviadas / max(time.monotonic() - inicio, 0.001)
+                    status.text(f"Lote enviado: {enviadas} entregas hasta ahora ({avance:.0%} del archivo leído) "
+                                f"· {ritmo:,.0f} filas/s")
                 
+                desde = trabajo["fila_confirmada"] if trabajo and retomar else 0
+                previos = trabajo["exitos"] if trabajo and retomar else 0
+                resumen = importar_entregas(
+                    supabase, saltar_filas(leer_en_bloques(archivo_ent), desde), columnas,
+                    int(tamano_lote_ent), al_avanzar=avanzar,
+                    al_confirmar=checkpoint(hash_entregas, "entregas", archivo_ent.name, previos),
+                    hash_archivo=hash_entregas, trabajadores=int(trabajadores_ent))
+                if resumen["completo"]:
+                    marcar_terminado(hash_entregas, "entregas")
+                if resumen["exitos"]:
+                    try:
+                        refrescar_estadisticas(supabase)
+                    except Exception as e:  # pg_cron las pone al día igual en unos minutos
+                        st.warning(f"⚠️ Las estadísticas del panel se actualizarán más tarde: {e}")
                 progreso.progress(100)
-                st.success(f"✅ Proceso terminado: {exitos} entregas subidas.")
-                if ruts_no_encontrados > 0:
-                    st.error(f"❌ {ruts_no_encontrados} entregas fallaron porque el RUT no estaba registrado en Personas.")
-                if errores > 0:
-                    st.warning(f"⚠️ {errores} fallaron por otros errores de formato.")
\ No newline at end of file
+                
+                st.session_state["resultado_entregas"] = {
+                    "exitos": resumen["exitos"],
+                    "ruts_no_encontrados": resumen["ruts_no_encontrados"],
+                    "errores": resumen["errores"],
+                    "rechazadas": resumen["rechazadas"].to_csv(index=False).encode('utf-8'),
+                }
+        
+        # El resultado se muestra fuera del formulario (st.download_button no funciona dentro de un form)
+        resultado = st.session_state.get("resultado_entregas")
+        if resultado:
+            st.success(f"✅ Proceso terminado: {resultado['exitos']} entregas subidas.")
+            if resultado["ruts_no_encontrados"] > 0:
+                st.error(f"❌ {resultado['ruts_no_encontrados']} entregas no se subieron porque el RUT no estaba registrado en Personas.")
+            if resultado["errores"] > 0:
+                st.warning(f"⚠️ {resultado['errores']} fallaron por otros errores de formato.")
+            if resultado["ruts_no_encontrados"] + resultado["errores"] > 0:
+                st.download_button(
+                    "📥 Descargar filas rechazadas (CSV)",
+                    data=resultado["rechazadas"],
+                    file_name="entregas_rechazadas.csv",
+                    mime="text/csv"
+                )
+
+# --- TIEMPOS DE LAS CONSULTAS A SUPABASE ---
+st.markdown("---")
+with st.expander("⏱️ Tiempos de las consultas a Supabase"):
+    registro = init_registro()
+    tipos = registro.por_tipo()
+    if tipos:
+        st.dataframe(pd.DataFrame(tipos), use_container_width=True, hide_index=True)
+        errores = registro.errores()
+        if errores:
+            st.write("**Últimos errores**")
+            st.dataframe(pd.DataFrame(errores), use_container_width=True, hide_index=True)
+    else:
+        st.info("Todavía no se ha hecho ninguna carga.")
\ No newline at end of file
@@ -0,0 +1,193 @@
+# --- COLA LOCAL DE ENTREGAS (usado por app.py) ---
+# En los centros de acopio la conexión se corta seguido. Cada entrega se guarda
+# primero en un SQLite local (uno por centro, en modo WAL) y un hilo en segundo
+# plano la sube a Supabase cuando hay conexión. Si se corta internet, la entrega
+# queda registrada igual y se sube después, sin duplicarse (clave_idempotencia).
+# Las que el servidor rechaza (RUT sin ficha, dato malo) se apartan en la tabla
+# 'fallidas' para revisarlas, sin trabar las entregas que vienen detrás.
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import closing
+from datetime import datetime
+
+import pytz
+
+from reintentos import es_error_de_datos
+
+chile_time = pytz.timezone('America/Santiago')
+
+CARPETA_COLAS = ".cola_entregas"
+TAMANO_ENVIO = 100      # entregas por insert al vaciar la cola
+INTERVALO_ENVIO = 5     # segundos entre intentos del hilo de envío
+
+
+class ColaEntregas:
+    """Cola durable de entregas pendientes de subir, para un centro de acopio."""
+
+    def __init__(self, centro, carpeta=CARPETA_COLAS):
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = re.sub(r"[^a-z0-9]+", "_", centro.lower()).strip("_") or "centro"
+        self.ruta = os.path.join(carpeta, f"{nombre}.sqlite")
+        self.ultimo_error = None
+        self._despertar = threading.Event()
+        self._hilo = None
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS pendientes (
+                    clave     TEXT PRIMARY KEY,
+                    rut       TEXT NOT NULL,
+                    datos     TEXT NOT NULL,
+                    creado    TEXT NOT NULL,
+                    intentos  INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS fallidas (
+                    clave     TEXT PRIMARY KEY,
+                    rut       TEXT NOT NULL,
+                    datos     TEXT NOT NULL,
+                    creado    TEXT NOT NULL,
+                    intentos  INTEGER NOT NULL,
+                    error     TEXT NOT NULL
+                )
+            """)
+
+    def _conectar(self):
+        # Una conexión por operación: la usan el script de Streamlit y el hilo de envío
+        return sqlite3.connect(self.ruta, timeout=10)
+
+    def encolar(self, entrega):
+        """Guarda la entrega en disco y la devuelve con su clave_idempotencia."""
+        return self.encolar_varias([entrega])[0]
+
+    def encolar_varias(self, entregas):
+        """Guarda varias entregas en una sola transacción; el hilo las sube en el mismo insert."""
+        entregas = [dict(e, clave_idempotencia=str(uuid.uuid4())) for e in entregas]
+        creado = datetime.now(chile_time).isoformat()
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.executemany(
+                "INSERT INTO pendientes (clave, rut, datos, creado) VALUES (?, ?, ?, ?)",
+                [(e["clave_idempotencia"], e["rut_beneficiario"], json.dumps(e), creado) for e in entregas])
+        self._despertar.set()
+        return entregas
+
+    def contar(self):
+        with closing(self._conectar()) as conexion:
+            return conexion.execute("SELECT COUNT(*) FROM pendientes").fetchone()[0]
+
+    def pendientes_de(self, ruts=None):
+        """Entregas aún sin subir para esos RUT, o todas si ruts es None (para las alertas y el historial).
+
+        Incluye las rechazadas: la ayuda igual se entregó en el mostrador.
+        """
+        if ruts is None:
+            filtro, parametros = "", []
+        elif not ruts:
+            return []
+        else:
+            filtro, parametros = f"WHERE rut IN ({','.join('?' * len(ruts))})", list(ruts)
+        with closing(self._conectar()) as conexion:
+            filas = conexion.execute(
+                f"SELECT datos, creado FROM pendientes {filtro} "
+                f"UNION ALL SELECT datos, creado FROM fallidas {filtro} ORDER BY creado",
+                parametros * 2).fetchall()
+        return [json.loads(f[0]) for f in filas]
+
+    def pendientes_hoy(self, ruts=None):
+        hoy = datetime.now(chile_time).date()
+        return [e for e in self.pendientes_de(ruts)
+                if datetime.fromisoformat(e["fecha_entrega"]).astimezone(chile_time).date() == hoy]
+
+    def fallidas(self):
+        """Entregas que el servidor rechazó, con el error (para mostrarlas en la barra lateral)."""
+        with closing(self._conectar()) as conexion:
+            filas = conexion.execute("SELECT datos, error FROM fallidas ORDER BY creado").fetchall()
+        return [dict(json.loads(datos), error=error) for datos, error in filas]
+
+    def reintentar_fallidas(self):
+        """Devuelve las rechazadas a la cola (por ejemplo, después de crear la ficha que faltaba)."""
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("INSERT OR IGNORE INTO pendientes (clave, rut, datos, creado) "
+                             "SELECT clave, rut, datos, creado FROM fallidas")
+            conexion.execute("DELETE FROM fallidas")
+        self._despertar.set()
+
+    def _subir(self, supabase, filas):
+        # Si un lote anterior sí llegó pero se cortó la respuesta, las repetidas se ignoran
+        supabase.table("entregas").upsert(
+            [json.loads(f[1]) for f in filas],
+            on_conflict="clave_idempotencia", ignore_duplicates=True).execute()
+        claves = [f[0] for f in filas]
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(f"DELETE FROM pendientes WHERE clave IN ({','.join('?' * len(claves))})", claves)
+        self.ultimo_error = None  # solo un envío que llegó demuestra que hay conexión
+
+    def _sin_conexion(self, error, filas):
+        self.ultimo_error = str(error)
+        claves = [f[0] for f in filas]
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(
+                f"UPDATE pendientes SET intentos = intentos + 1 WHERE clave IN ({','.join('?' * len(claves))})",
+                claves)
+
+    def _apartar(self, fila, error):
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("INSERT OR REPLACE INTO fallidas (clave, rut, datos, creado, intentos, error) "
+                             "SELECT clave, rut, datos, creado, intentos + 1, ? FROM pendientes WHERE clave = ?",
+                             (str(error)[:300], fila[0]))
+            conexion.execute("DELETE FROM pendientes WHERE clave = ?", (fila[0],))
+
+    def enviar_pendientes(self, supabase, tamano=TAMANO_ENVIO):
+        """Sube la cola por lotes. Devuelve cuántas entregas se subieron.
+
+        Solo un rechazo por los datos (ver reintentos.es_error_de_datos) hace reenviar el
+        lote de a una entrega, y las que vuelven a ser rechazadas pasan a 'fallidas'.
+        Cualquier otro error (sin conexión, base de datos caída o saturada) deja la cola
+        intacta para la próxima vuelta.
+        """
+        enviadas = 0
+        while True:
+            with closing(self._conectar()) as conexion:
+                filas = conexion.execute(
+                    "SELECT clave, datos FROM pendientes ORDER BY creado LIMIT ?", (tamano,)).fetchall()
+            if not filas:
+                break
+            try:
+                self._subir(supabase, filas)
+                enviadas += len(filas)
+            except Exception as e:
+                if not es_error_de_datos(e):
+                    self._sin_conexion(e, filas)
+                    break
+                for fila in filas:
+                    try:
+                        self._subir(supabase, [fila])
+                        enviadas += 1
+                    except Exception as e:
+                        if not es_error_de_datos(e):
+                            self._sin_conexion(e, [fila])
+                            return enviadas
+                        self._apartar(fila, e)
+        return enviadas
+
+    def iniciar_envio(self, supabase, intervalo=INTERVALO_ENVIO):
+        """Lanza (una sola vez) el hilo que vacía la cola cada 'intervalo' segundos o al encolar."""
+        if self._hilo and self._hilo.is_alive():
+            return
+
+        def ciclo():
+            while True:
+                self._despertar.wait(intervalo)
+                self._despertar.clear()
+                try:
+                    self.enviar_pendientes(supabase)
+                except Exception as e:  # el hilo nunca debe morir: la próxima vuelta reintenta
+                    self.ultimo_error = str(e)
+
+        self._hilo = threading.Thread(target=ciclo, name=f"cola-{os.path.basename(self.ruta)}", daemon=True)
+        self._hilo.start()
@@ -0,0 +1,109 @@
+# --- CONSULTAS DEL MOSTRADOR (usado por app.py) ---
+from datetime import datetime, time, timedelta
+
+import pytz
+from postgrest.exceptions import APIError
+
+from normalizacion import clave_direccion
+
+chile_time = pytz.timezone('America/Santiago')
+
+FICHA_VACIA = {"persona": None, "ruts_hogar": [], "entregas_hoy_hogar": [], "historial": []}
+
+# Solo lo que muestra la ALERTA DE DIRECCIÓN, más la clave para no repetir las que siguen en la cola local
+COLUMNAS_ALERTA_HOGAR = "rut_beneficiario, item, centro_acopio, fecha_entrega, clave_idempotencia"
+
+
+def rango_de_hoy():
+    """Medianoche de hoy y de mañana en Chile, en ISO con zona horaria."""
+    hoy = datetime.now(chile_time).date()
+    desde = chile_time.localize(datetime.combine(hoy, time.min))
+    hasta = chile_time.localize(datetime.combine(hoy + timedelta(days=1), time.min))
+    return desde.isoformat(), hasta.isoformat()
+
+
+def entregas_hoy_hogar(supabase, ruts):
+    """Entregas de hoy a cualquiera de esos RUT, filtradas en el servidor.
+
+    Usa el índice (rut_beneficiario, fecha_entrega): no baja el historial completo del hogar.
+    """
+    desde, hasta = rango_de_hoy()
+    return (supabase.table("entregas").select(COLUMNAS_ALERTA_HOGAR)
+            .in_("rut_beneficiario", ruts)
+            .gte("fecha_entrega", desde).lt("fecha_entrega", hasta)
+            .order("fecha_entrega").execute().data)
+
+
+def buscar_hogar(supabase, clave):
+    """Fichas que comparten la clave de dirección (ver normalizacion.clave_direccion).
+
+    Búsqueda exacta sobre la columna indexada direccion_clave.
+    """
+    if not clave:
+        return []
+    return (supabase.table("beneficiarios").select("rut, nombre, direccion")
+            .eq("direccion_clave", clave).execute().data)
+
+
+def buscar_beneficiario(supabase, rut):
+    """Trae en una sola llamada la ficha, su hogar, las entregas de hoy del hogar y el historial.
+
+    Usa la función buscar_beneficiario de la base de datos (ver supabase/migrations).
+    Si todavía no está instalada en el proyecto, arma lo mismo con consultas sueltas.
+    """
+    try:
+        return supabase.rpc("buscar_beneficiario", {"p_rut": rut}).execute().data or FICHA_VACIA
+    except APIError as e:
+        if e.code != "PGRST202":  # PGRST202: la función no existe en el esquema
+            raise
+    return _buscar_beneficiario_por_partes(supabase, rut)
+
+
+def _buscar_beneficiario_por_partes(supabase, rut):
+    persona = supabase.table("beneficiarios").select("*").eq("rut", rut).execute().data
+    if not persona:
+        return FICHA_VACIA
+    p = persona[0]
+
+    vecinos = buscar_hogar(supabase, p.get('direccion_clave') or clave_direccion(p['direccion']))
+    ruts_hogar = sorted({v['rut'] for v in vecinos} | {p['rut']})
+
+    entregas_hoy = entregas_hoy_hogar(supabase, ruts_hogar) if ruts_hogar else []
+
+    historial = supabase.table("entregas").select("*").eq("rut_beneficiario", rut).order("fecha_entrega", desc=True).execute()
+    return {"persona": p, "ruts_hogar": ruts_hogar, "entregas_hoy_hogar": entregas_hoy,
+            "historial": historial.data}
+
+
+# --- DATOS DE REFERENCIA (con cache, ver cache_ttl.py) ---
+def catalogo(supabase, cache):
+    return cache.obtener("catalogo", lambda: [
+        i['nombre_item'] for i in supabase.table("catalogo_ayuda").select("nombre_item").execute().data])
+
+
+def centros_acopio(supabase, cache):
+    return cache.obtener("centros", lambda: [
+        c['centro_acopio'] for c in supabase.table("v_centros_acopio").select("centro_acopio").execute().data])
+
+
+def funcionarios(supabase, cache):
+    return cache.obtener("funcionarios", lambda: [
+        f['usuario_responsable'] for f in supabase.table("v_funcionarios").select("usuario_responsable").execute().data])
+
+
+# --- ESTADÍSTICAS DEL PANEL DE JEFES (vistas materializadas, ver supabase/migrations) ---
+TTL_ESTADISTICAS = 60  # segundos
+
+
+def estadisticas(supabase, cache):
+    """Totales por centro, top 10 de familias y totales por item, ya agregados en el servidor."""
+    return cache.obtener("estadisticas", lambda: {
+        "por_centro": supabase.table("v_entregas_por_centro").select("*").order("entregas", desc=True).execute().data,
+        "top_familias": supabase.table("v_top_familias").select("*").order("retiros", desc=True).execute().data,
+        "por_item": supabase.table("v_totales_por_item").select("*").order("total", desc=True).execute().data,
+    }, ttl=TTL_ESTADISTICAS)
+
+
+def refrescar_estadisticas(supabase):
+    """Recalcula las vistas materializadas del panel (al terminar una carga masiva)."""
+    supabase.rpc("refrescar_estadisticas").execute()
@@ -0,0 +1,386 @@
+# --- MOTOR DE CARGA MASIVA (usado por carga_masiva.py) ---
+# Separa la lógica de preparación y envío por lotes de la interfaz Streamlit.
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import openpyxl
+import pytz
+
+from normalizacion import limpiar_ruts
+from reintentos import ControlConcurrencia, enviar_con_reintentos
+from trabajos import clave_idempotencia
+
+TAMANO_LOTE = 500
+chile_time = pytz.timezone('America/Santiago')
+
+
+def partir_en_lotes(registros, tamano=TAMANO_LOTE):
+    for inicio in range(0, len(registros), tamano):
+        yield registros[inicio:inicio + tamano]
+
+
+def _enviar_lote(enviar_lote, lote, control):
+    registros = lote.to_dict("records")
+    with control:
+        enviar_con_reintentos(lambda: enviar_lote(registros), control=control)
+
+
+def subir_en_lotes(enviar_lote, datos, tamano_lote=TAMANO_LOTE, al_avanzar=None, control=None):
+    """Envía un DataFrame en lotes usando enviar_lote(lista_de_dicts).
+
+    Con un ControlConcurrencia de máximo mayor a 1 varios lotes viajan a la
+    vez; la función vuelve recién cuando todos terminaron, así el bloque
+    completo queda confirmado antes de pasar al siguiente. al_avanzar se llama
+    siempre desde el hilo principal (Streamlit no acepta llamadas desde otros hilos).
+
+    Devuelve (exitos, fallidas): fallidas son las filas de los lotes que no
+    pudieron subirse tras los reintentos, con el detalle en la columna 'motivo'.
+    """
+    control = control or ControlConcurrencia(1)
+    exitos, procesadas, fallidas = 0, 0, []
+    with ThreadPoolExecutor(max_workers=control.maximo) as pool:
+        futuros = {}
+        for inicio in range(0, len(datos), tamano_lote):
+            lote = datos.iloc[inicio:inicio + tamano_lote]
+            futuros[pool.submit(_enviar_lote, enviar_lote, lote, control)] = lote
+        for futuro in as_completed(futuros):
+            lote = futuros[futuro]
+            try:
+                futuro.result()
+                exitos += len(lote)
+            except Exception as e:
+                fallidas.append(lote.assign(motivo=f"Error al subir el lote: {e}"))
+            procesadas += len(lote)
+            if al_avanzar:
+                al_avanzar(procesadas, len(datos))
+    return exitos, pd.concat(fallidas).sort_index() if fallidas else pd.DataFrame()
+
+
+# ==========================================
+# LECTURA DE ARCHIVOS POR BLOQUES
+# ==========================================
+# Los padrones regionales pueden traer cientos de miles de filas: nunca se
+# carga el archivo completo en memoria, se procesa bloque a bloque.
+TAMANO_BLOQUE_LECTURA = 5000
+FILAS_MUESTRA = 5
+
+
+def _es_csv(archivo):
+    return archivo.name.lower().endswith("csv")
+
+
+def _es_xlsx(archivo):
+    return archivo.name.lower().endswith("xlsx")
+
+
+def leer_muestra(archivo, filas=FILAS_MUESTRA):
+    """Lee solo las primeras filas, para la previsualización y la lista de columnas."""
+    return next(leer_en_bloques(archivo, filas))[0]
+
+
+def leer_en_bloques(archivo, tamano=TAMANO_BLOQUE_LECTURA):
+    """Recorre el archivo subido entregando (bloque, avance) con avance entre 0 y 1.
+
+    El índice de cada bloque sigue la numeración de filas del archivo completo.
+    """
+    # Copia liviana (comparte los bytes) para que pandas pueda cerrarla sin cerrar el archivo subido
+    contenido = io.BytesIO(archivo.getvalue())
+    if _es_csv(archivo):
+        total = len(contenido.getbuffer())
+        for bloque in pd.read_csv(contenido, chunksize=tamano):
+            yield bloque, (contenido.tell() / total if total else 0)
+    elif _es_xlsx(archivo):
+        libro = openpyxl.load_workbook(contenido, read_only=True, data_only=True)
+        try:
+            hoja = libro.active
+            filas = hoja.iter_rows(values_only=True)
+            columnas = [str(c) if c is not None else f"Columna {i + 1}"
+                        for i, c in enumerate(next(filas, []))]
+            total = (hoja.max_row or 1) - 1
+            leidas = 0
+            while True:
+                valores = list(islice(filas, tamano))
+                if not valores:
+                    break
+                bloque = pd.DataFrame(valores, columns=columnas)
+                bloque.index = pd.RangeIndex(leidas, leidas + len(bloque))
+                leidas += len(bloque)
+                yield bloque, (min(leidas / total, 1) if total > 0 else 0)
+            if not leidas:
+                # Solo encabezado: un bloque vacío con las columnas, igual que pandas con un CSV
+                yield pd.DataFrame(columns=columnas), 1
+        finally:
+            libro.close()
+    else:
+        # .xls antiguo: openpyxl no lo lee en modo streaming, se lee completo
+        yield pd.read_excel(contenido), 1
+
+
+def saltar_filas(bloques, desde):
+    """Descarta las filas anteriores a 'desde' (ya confirmadas en una carga anterior)."""
+    for bloque, avance in bloques:
+        bloque = bloque[bloque.index >= desde]
+        if not bloque.empty:
+            yield bloque, avance
+
+
+# ==========================================
+# PADRÓN DE PERSONAS (BENEFICIARIOS)
+# ==========================================
+def preparar_personas(df, c_rut, c_nom, c_dir, c_fam, c_sec=None):
+    """Arma los registros de beneficiarios de forma vectorizada.
+
+    Devuelve (datos, duplicados): los RUT repetidos dentro del archivo se
+    colapsan dejando la última fila, igual que hacían los upsert uno a uno.
+    """
+    datos = pd.DataFrame({
+        "rut": limpiar_ruts(df[c_rut]),
+        "nombre": df[c_nom].fillna("").astype(str).str.strip(),
+        "direccion": df[c_dir].fillna("").astype(str).str.strip(),
+        "cant_familia": pd.to_numeric(df[c_fam], errors="coerce").fillna(1).astype(int),
+        "afectado": True,
+    })
+    if c_sec:
+        datos["sector"] = df[c_sec].fillna("").astype(str)
+
+    # Filas sin RUT no se pueden cargar
+    datos = datos[df[c_rut].notna() & (datos["rut"] != "")]
+
+    total = len(datos)
+    datos = datos.drop_duplicates(subset="rut", keep="last")
+    return datos, total - len(datos)
+
+
+def subir_personas(supabase, datos, tamano_lote=TAMANO_LOTE, al_avanzar=None, control=None):
+    """Hace upsert de los beneficiarios en lotes. Devuelve (exitos, errores)."""
+    exitos, fallidas = subir_en_lotes(
+        lambda registros: supabase.table("beneficiarios").upsert(registros).execute(),
+        datos, tamano_lote, al_avanzar, control)
+    return exitos, len(fallidas)
+
+
+def importar_personas(supabase, bloques, columnas, tamano_lote=TAMANO_LOTE, al_avanzar=None,
+                      al_confirmar=None, trabajadores=1):
+    """Prepara y sube el padrón bloque a bloque, a medida que se va leyendo.
+
+    columnas son los argumentos c_* de preparar_personas. al_avanzar recibe
+    (filas_enviadas, avance_lectura) después de cada lote; al_confirmar recibe
+    (fila_siguiente, resumen) cada vez que un bloque completo quedó confirmado.
+    Los lotes de un bloque pueden viajar en paralelo (trabajadores > 1): dentro
+    del bloque no hay RUT repetidos, y los bloques van en orden, así que si un
+    RUT se repite en el archivo igual gana la última fila.
+    """
+    control = ControlConcurrencia(trabajadores)
+    resumen = {"exitos": 0, "errores": 0, "duplicados": 0}
+    for bloque, avance in bloques:
+        datos, duplicados = preparar_personas(bloque, **columnas)
+        base = resumen["exitos"] + resumen["errores"]
+        exitos, errores = subir_personas(
+            supabase, datos, tamano_lote,
+            al_avanzar=(lambda hechas, _: al_avanzar(base + hechas, avance)) if al_avanzar else None,
+            control=control)
+        resumen["exitos"] += exitos
+        resumen["errores"] += errores
+        resumen["duplicados"] += duplicados
+        # Tras el primer lote fallido el checkpoint ya no avanza: al reanudar se reintenta desde ahí
+        if al_confirmar and resumen["errores"] == 0:
+            al_confirmar(bloque.index[-1] + 1, resumen)
+    resumen["completo"] = resumen["errores"] == 0
+    return resumen
+
+
+# ==========================================
+# ENTREGAS HISTÓRICAS
+# ==========================================
+USUARIO_CARGA = "Admin (Carga Masiva)"
+TAMANO_CONSULTA_RUT = 200  # RUTs por consulta in_, para no pasarse del largo de URL
+
+
+def ruts_existentes(supabase, ruts, tamano=TAMANO_CONSULTA_RUT):
+    """De los RUT entregados, devuelve el set de los que ya están en beneficiarios."""
+    conocidos = set()
+    for lote in partir_en_lotes(sorted(set(ruts)), tamano):
+        resp = enviar_con_reintentos(
+            lambda: supabase.table("beneficiarios").select("rut").in_("rut", lote).execute())
+        conocidos.update(r["rut"] for r in resp.data)
+    return conocidos
+
+
+# Formatos aceptados, día primero como se escriben en Chile. El orden importa:
+# "03-04-2024" se lee como 3 de abril y nunca como 4 de marzo.
+FORMATOS_FECHA = [
+    "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d-%m-%Y",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+    "%d-%m-%y", "%d/%m/%y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d",
+    # Respaldos de la base de datos y fechas de Excel pasadas a texto traen fracciones de segundo
+    "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S.%f",
+]
+# Los timestamptz exportados terminan en zona: "...13:00:00.123+00", "...-03:00" o "...Z"
+CON_ZONA = r"\d(?:Z|[+-]\d{2}(?::?\d{2})?)$"
+
+
+def _a_hora_chile(fechas):
+    if fechas.dt.tz is not None:
+        return fechas.dt.tz_convert(chile_time)
+    # En el cambio de hora de abril la hora repetida se toma como horario de invierno
+    return fechas.dt.tz_localize(chile_time, ambiguous=np.zeros(len(fechas), dtype=bool),
+                                 nonexistent="shift_forward")
+
+
+def normalizar_fechas(serie):
+    """Convierte una columna de fechas a hora de Chile. Lo que no calza queda NaT.
+
+    Las fechas sin zona se toman como hora de Chile; las que traen zona se convierten.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return _a_hora_chile(serie)
+
+    # Celdas de Excel ya leídas como fecha quedan como "AAAA-MM-DD HH:MM:SS" al pasarlas a texto
+    texto = serie.astype(str).str.strip()
+    fechas = pd.to_datetime(texto, format=FORMATOS_FECHA[0], errors="coerce")
+    for formato in FORMATOS_FECHA[1:]:
+        faltan = fechas.isna()
+        if not faltan.any():
+            break
+        fechas = fechas.fillna(pd.to_datetime(texto[faltan], format=formato, errors="coerce"))
+    fechas = _a_hora_chile(fechas)
+
+    con_zona = fechas.isna() & texto.str.contains(CON_ZONA)
+    if con_zona.any():
+        en_utc = pd.to_datetime(texto[con_zona], format="ISO8601", utc=True, errors="coerce")
+        fechas = fechas.fillna(en_utc.dt.tz_convert(chile_time))
+    return fechas
+
+
+def normalizar_entregas(df, c_rut, c_item, c_cant, c_fecha=None, fecha_fija=None,
+                        c_centro=None, centro_fijo=None):
+    """Normaliza columna a columna las entregas del archivo.
+
+    Devuelve (datos, motivo): motivo es una serie alineada con df que queda
+    vacía para las filas correctas y explica el error en las demás.
+    """
+    ruts = limpiar_ruts(df[c_rut])
+    items = df[c_item].astype(str).str.strip()
+
+    cantidades = pd.to_numeric(df[c_cant], errors="coerce")
+    cantidad_ok = cantidades.notna() & (cantidades >= 1) & (cantidades == cantidades.round())
+
+    if c_fecha:
+        fechas = normalizar_fechas(df[c_fecha])
+    else:
+        fechas = pd.Series(chile_time.localize(datetime.combine(fecha_fija, datetime.min.time())),
+                           index=df.index)
+
+    if c_centro:
+        centros = df[c_centro].astype(str).str.strip()
+        centro_ok = df[c_centro].notna() & (centros != "")
+    else:
+        centros = pd.Series(centro_fijo, index=df.index)
+        centro_ok = pd.Series(True, index=df.index)
+
+    motivo = pd.Series(np.select(
+        [df[c_rut].isna() | (ruts == ""),
+         df[c_item].isna() | (items == ""),
+         ~cantidad_ok,
+         fechas.isna(),
+         ~centro_ok],
+        ["RUT vacío",
+         "Item vacío",
+         "Cantidad inválida (debe ser un entero mayor a 0)",
+         "Fecha inválida (use DD-MM-AAAA)",
+         "Centro de acopio vacío"],
+        default=""), index=df.index)
+
+    ok = motivo == ""
+    datos = pd.DataFrame({
+        "rut_beneficiario": ruts[ok],
+        "item": items[ok],
+        "cantidad": cantidades[ok].astype(int),
+        "centro_acopio": centros[ok],
+        "fecha_entrega": fechas[ok].dt.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "usuario_responsable": USUARIO_CARGA,
+    })
+    return datos, motivo
+
+
+def preparar_entregas(df, c_rut, c_item, c_cant, c_fecha=None, fecha_fija=None,
+                      c_centro=None, centro_fijo=None):
+    """Arma los registros de entregas. Devuelve (datos, rechazadas).
+
+    rechazadas trae las filas originales del archivo con la columna 'motivo'.
+    """
+    datos, motivo = normalizar_entregas(df, c_rut, c_item, c_cant, c_fecha, fecha_fija,
+                                        c_centro, centro_fijo)
+    malas = motivo != ""
+    return datos, df[malas].assign(motivo=motivo[malas])
+
+
+def separar_ruts_desconocidos(supabase, df, datos):
+    """Separa las entregas cuyo RUT no existe en beneficiarios, sin intentar insertarlas.
+
+    Devuelve (validas, rechazadas) con rechazadas en el formato del archivo original.
+    """
+    if datos.empty:
+        return datos, df.iloc[0:0].assign(motivo=[])
+    conocidos = ruts_existentes(supabase, datos["rut_beneficiario"])
+    conocido = datos["rut_beneficiario"].isin(conocidos)
+    rechazadas = df.loc[datos.index[~conocido]].assign(motivo="RUT no registrado en Personas")
+    return datos[conocido], rechazadas
+
+
+def subir_entregas(supabase, datos, tamano_lote=TAMANO_LOTE, al_avanzar=None, control=None):
+    """Inserta las entregas ya validadas en lotes. Devuelve (exitos, fallidas).
+
+    Si los registros traen clave_idempotencia, las filas que ya estaban en el
+    servidor se ignoran en vez de duplicarse.
+    """
+    if "clave_idempotencia" in datos:
+        enviar = lambda registros: supabase.table("entregas").upsert(
+            registros, on_conflict="clave_idempotencia", ignore_duplicates=True).execute()
+    else:
+        enviar = lambda registros: supabase.table("entregas").insert(registros).execute()
+    return subir_en_lotes(enviar, datos, tamano_lote, al_avanzar, control)
+
+
+def importar_entregas(supabase, bloques, columnas, tamano_lote=TAMANO_LOTE, al_avanzar=None,
+                      al_confirmar=None, hash_archivo=None, trabajadores=1):
+    """Valida y sube las entregas bloque a bloque, a medida que se va leyendo.
+
+    columnas son los argumentos de preparar_entregas. Solo se acumulan en
+    memoria las filas rechazadas, para devolverlas como archivo. Con
+    hash_archivo cada fila lleva su clave de idempotencia, y volver a subir
+    el mismo archivo no duplica entregas. Con trabajadores > 1 los lotes de
+    cada bloque se envían en paralelo; el checkpoint sigue avanzando por bloque.
+    """
+    control = ControlConcurrencia(trabajadores)
+    resumen = {"exitos": 0, "ruts_no_encontrados": 0, "errores": 0, "rechazadas": []}
+    enviadas, hubo_fallas = 0, False
+    for bloque, avance in bloques:
+        datos, rechazadas_formato = preparar_entregas(bloque, **columnas)
+        if hash_archivo:
+            datos["clave_idempotencia"] = [clave_idempotencia(hash_archivo, fila) for fila in datos.index]
+        validas, rechazadas_rut = separar_ruts_desconocidos(supabase, bloque, datos)
+        exitos, fallidas = subir_entregas(
+            supabase, validas, tamano_lote,
+            al_avanzar=(lambda hechas, _: al_avanzar(enviadas + hechas, avance)) if al_avanzar else None,
+            control=control)
+        enviadas += len(validas)
+
+        resumen["exitos"] += exitos
+        resumen["ruts_no_encontrados"] += len(rechazadas_rut)
+        resumen["errores"] += len(rechazadas_formato) + len(fallidas)
+        resumen["rechazadas"] += [rechazadas_formato, rechazadas_rut]
+        if not fallidas.empty:
+            resumen["rechazadas"].append(bloque.loc[fallidas.index].assign(motivo=fallidas["motivo"]))
+            hubo_fallas = True
+        # Tras el primer lote fallido el checkpoint ya no avanza: al reanudar se reintenta desde ahí
+        if al_confirmar and not hubo_fallas:
+            al_confirmar(bloque.index[-1] + 1, resumen)
+    resumen["rechazadas"] = pd.concat(resumen["rechazadas"]) if resumen["rechazadas"] else pd.DataFrame()
+    resumen["completo"] = not hubo_fallas
+    return resumen
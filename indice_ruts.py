@@ -0,0 +1,218 @@
+# --- ÍNDICE EN MEMORIA DEL PADRÓN (usado por el Buscador de app.py) ---
+# Una copia liviana de RUT, nombre y dirección de todas las fichas, compartida
+# entre sesiones y refrescada cada unos minutos en segundo plano. Permite
+# sugerir fichas mientras se escribe un RUT incompleto o con un dígito
+# cambiado, y buscar por nombre, sin ir a Supabase en cada búsqueda. Sin conexión,
+# también arma la ficha mínima y el hogar de un RUT (ver app.py).
+import difflib
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from normalizacion import clave_direccion, digito_verificador, normalizar_nombre
+from reintentos import enviar_con_reintentos
+
+TAMANO_PAGINA = 1000        # filas pedidas por página; el proyecto puede tener un max_rows menor
+INTERVALO_REFRESCO = 600    # segundos entre recargas completas del padrón
+MAX_SUGERENCIAS = 5
+LARGO_MINIMO_PREFIJO = 3    # con menos letras, una palabra solo calza completa
+# Puntaje de cada palabra escrita según cómo calza en el nombre
+PUNTAJE_EXACTA, PUNTAJE_PREFIJO, PUNTAJE_PARECIDA = 3, 2, 1
+
+
+def leer_padron(supabase, tamano=TAMANO_PAGINA):
+    """Recorre beneficiarios (rut, nombre, direccion, direccion_clave) ordenado por RUT, página a página."""
+    ultimo = None
+    while True:
+        consulta = supabase.table("beneficiarios").select("rut, nombre, direccion, direccion_clave")
+        if ultimo:
+            consulta = consulta.gt("rut", ultimo)
+        pagina = enviar_con_reintentos(consulta.order("rut").limit(tamano).execute).data
+        # Solo una página vacía marca el final: una corta puede ser el max_rows del proyecto
+        if not pagina:
+            return
+        yield from pagina
+        ultimo = pagina[-1]["rut"]
+
+
+def variantes_del_cuerpo(cuerpo):
+    """Cuerpos de RUT a un error de tipeo: un dígito cambiado o dos vecinos invertidos."""
+    variantes = set()
+    for i in range(len(cuerpo)):
+        for d in "0123456789":
+            variantes.add(cuerpo[:i] + d + cuerpo[i + 1:])
+        if i + 1 < len(cuerpo):
+            variantes.add(cuerpo[:i] + cuerpo[i + 1] + cuerpo[i] + cuerpo[i + 2:])
+    variantes.discard(cuerpo)
+    return variantes
+
+
+class _Datos:
+    # Una foto del padrón; se reemplaza entera al refrescar
+    def __init__(self):
+        self.fichas = {}        # rut -> (nombre, direccion)
+        self.ruts = []          # ordenados, para buscar por prefijo
+        self.por_palabra = {}   # palabra del nombre normalizado -> {ruts}
+        self.palabras = []      # ordenadas, para buscar por prefijo
+        self.claves = {}        # rut -> clave de dirección
+        self.por_clave = {}     # clave de dirección -> {ruts}, el hogar cuando no hay conexión
+
+    def agregar(self, rut, nombre, direccion, clave=None):
+        if rut not in self.fichas:
+            insort(self.ruts, rut)
+        self.fichas[rut] = (nombre, direccion)
+        clave = self.claves[rut] = clave or clave_direccion(direccion)
+        if clave:
+            self.por_clave[clave] = self.por_clave.get(clave, set()) | {rut}
+        for palabra in set(normalizar_nombre(nombre).split()):
+            if palabra not in self.por_palabra:
+                insort(self.palabras, palabra)
+            # Set nuevo en vez de modificarlo: una búsqueda en curso puede estar recorriéndolo
+            self.por_palabra[palabra] = self.por_palabra.get(palabra, set()) | {rut}
+
+
+class IndiceRuts:
+    """RUT y nombres del padrón en memoria, con búsqueda por prefijo, por error de tipeo y por nombre."""
+
+    def __init__(self):
+        self._datos = _Datos()
+        self._candado = threading.Lock()
+        self._hilo = None
+        self.listo = False
+        self.ultimo_error = None
+
+    def __len__(self):
+        return len(self._datos.fichas)
+
+    def cargar(self, supabase):
+        """Lee el padrón completo y reemplaza la foto anterior de una vez."""
+        nuevos = _Datos()
+        for ficha in leer_padron(supabase):
+            nuevos.fichas[ficha["rut"]] = (ficha["nombre"], ficha["direccion"])
+            clave = nuevos.claves[ficha["rut"]] = ficha.get("direccion_clave") or clave_direccion(ficha["direccion"])
+            if clave:
+                nuevos.por_clave.setdefault(clave, set()).add(ficha["rut"])
+        nuevos.ruts = sorted(nuevos.fichas)
+        for rut, (nombre, _) in nuevos.fichas.items():
+            for palabra in set(normalizar_nombre(nombre).split()):
+                nuevos.por_palabra.setdefault(palabra, set()).add(rut)
+        nuevos.palabras = sorted(nuevos.por_palabra)
+        with self._candado:
+            self._datos = nuevos
+        self.listo = True
+
+    def agregar(self, rut, nombre, direccion, clave=None):
+        """Suma una ficha recién registrada sin esperar al próximo refresco.
+
+        clave es la direccion_clave que calculó la base de datos; sin ella se calcula aquí.
+        """
+        with self._candado:
+            self._datos.agregar(rut, nombre, direccion, clave)
+
+    def iniciar_refresco(self, supabase, intervalo=INTERVALO_REFRESCO):
+        """Lanza (una sola vez) el hilo que recarga el padrón cada 'intervalo' segundos."""
+        if self._hilo and self._hilo.is_alive():
+            return
+
+        def ciclo():
+            while True:
+                try:
+                    self.cargar(supabase)
+                    self.ultimo_error = None
+                except Exception as e:  # el hilo nunca debe morir: se queda con la foto anterior
+                    self.ultimo_error = str(e)
+                time.sleep(intervalo)
+
+        self._hilo = threading.Thread(target=ciclo, name="indice-ruts", daemon=True)
+        self._hilo.start()
+
+    def ficha(self, rut):
+        """RUT, nombre y dirección de la ficha, o None si no está en el padrón cargado."""
+        datos = self._datos
+        if rut not in datos.fichas:
+            return None
+        nombre, direccion = datos.fichas[rut]
+        return {"rut": rut, "nombre": nombre, "direccion": direccion}
+
+    def hogar(self, rut):
+        """RUT que comparten la clave de dirección de esa ficha (incluido el mismo rut)."""
+        datos = self._datos
+        if rut not in datos.fichas:
+            return []
+        return sorted(datos.por_clave.get(datos.claves[rut], set()) | {rut})
+
+    def _sugerencia(self, datos, rut, motivo):
+        nombre, direccion = datos.fichas[rut]
+        return {"rut": rut, "nombre": nombre, "direccion": direccion, "motivo": motivo}
+
+    def buscar_rut(self, rut_limpio, limite=MAX_SUGERENCIAS):
+        """Fichas parecidas a un RUT limpio (ver normalizacion.limpiar_rut), de la más a la menos probable.
+
+        Primero el RUT exacto, luego los que empiezan igual, los que solo cambian en el
+        dígito verificador y los que están a un error de tipeo en el cuerpo.
+        """
+        datos = self._datos
+        encontrados = {}
+
+        def sumar(rut, motivo):
+            if rut in datos.fichas and rut not in encontrados and len(encontrados) < limite:
+                encontrados[rut] = motivo
+
+        sumar(rut_limpio, "exacto")
+        i = bisect_left(datos.ruts, rut_limpio)
+        while i < len(datos.ruts) and datos.ruts[i].startswith(rut_limpio) and len(encontrados) < limite:
+            sumar(datos.ruts[i], "empieza igual")
+            i += 1
+        # El texto puede traer el DV al final o ser solo el cuerpo (de 7 u 8 dígitos)
+        cuerpos = [c for c in (rut_limpio[:-1], rut_limpio) if c.isdigit() and len(c) >= 7]
+        for cuerpo in cuerpos:
+            sumar(cuerpo + digito_verificador(cuerpo), "otro dígito verificador")
+        for cuerpo in cuerpos:
+            for variante in sorted(variantes_del_cuerpo(cuerpo)):
+                sumar(variante + digito_verificador(variante), "un dígito distinto")
+        return [self._sugerencia(datos, rut, motivo) for rut, motivo in encontrados.items()]
+
+    def _ruts_de(self, datos, termino):
+        """[(puntaje, ruts)]: RUT con esa palabra completa, con una que empieza así o con una parecida."""
+        niveles = [(PUNTAJE_EXACTA, datos.por_palabra.get(termino, set()))]
+        if len(termino) < LARGO_MINIMO_PREFIJO:
+            return niveles
+        i = j = bisect_left(datos.palabras, termino)
+        while j < len(datos.palabras) and datos.palabras[j].startswith(termino):
+            j += 1
+        palabras = [p for p in datos.palabras[i:j] if p != termino]
+        if palabras:
+            niveles.append((PUNTAJE_PREFIJO, set().union(*(datos.por_palabra[p] for p in palabras))))
+        elif not niveles[0][1]:
+            # Nada empieza así: se prueba con palabras parecidas ("gonzales" -> "gonzalez")
+            palabras = difflib.get_close_matches(termino, datos.palabras, n=3, cutoff=0.8)
+            niveles.append((PUNTAJE_PARECIDA, set().union(*(datos.por_palabra[p] for p in palabras))))
+        return niveles
+
+    def buscar_nombre(self, texto, limite=MAX_SUGERENCIAS):
+        """Fichas cuyo nombre calza con todas las palabras escritas, las que calzan mejor primero.
+
+        Cada palabra suma según calce completa, por el comienzo o parecida; a igual puntaje
+        van primero los nombres con las palabras en el mismo orden. Si una palabra no
+        calza con ningún nombre, no hay sugerencias.
+        """
+        datos = self._datos
+        escritas = normalizar_nombre(texto).split()
+        terminos = [self._ruts_de(datos, p) for p in escritas]
+        if not terminos:
+            return []
+        # Las intersecciones de sets son rápidas aunque cada palabra tenga miles de fichas
+        candidatos = set.intersection(*(set().union(*(r for _, r in niveles)) for niveles in terminos))
+
+        def puntaje(rut):
+            return sum(next(p for p, r in niveles if rut in r) for niveles in terminos)
+
+        def en_orden(rut):
+            if len(escritas) < 2:
+                return True
+            palabras = iter(normalizar_nombre(datos.fichas[rut][0]).split())
+            return all(any(p.startswith(e) for p in palabras) for e in escritas)
+
+        elegidos = heapq.nsmallest(limite, candidatos, key=lambda rut: (-puntaje(rut), not en_orden(rut), rut))
+        return [self._sugerencia(datos, rut, "nombre") for rut in elegidos]
@@ -0,0 +1,153 @@
+# --- MEDICIÓN DE LAS CONSULTAS A SUPABASE (app.py, carga_masiva.py y benchmarks/) ---
+# ClienteInstrumentado envuelve al cliente de Supabase: cada execute() queda
+# registrado con su tipo (tabla, operación y columnas filtradas), filas, bytes,
+# latencia y error, sin cambiar nada del código que arma las consultas.
+# RegistroConsultas guarda las últimas mediciones de cada tipo para calcular
+# p50/p95 y lleva las consultas lentas y los errores por centro de acopio.
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pytz
+
+chile_time = pytz.timezone('America/Santiago')
+
+VENTANA = 500        # mediciones por tipo de consulta para los percentiles
+UMBRAL_LENTA = 1.0   # segundos: desde aquí una consulta se guarda como lenta
+MAX_DETALLE = 50     # consultas lentas y errores recientes que se guardan
+SIN_CENTRO = "(sin centro)"
+
+OPERACIONES = {"select", "insert", "upsert", "update", "delete"}
+FILTROS = {"eq", "neq", "gt", "gte", "lt", "lte", "in_", "like", "ilike", "is_", "or_"}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+class RegistroConsultas:
+    """Estadísticas móviles por tipo de consulta y por centro, compartidas entre hilos."""
+
+    def __init__(self, ventana=VENTANA, umbral_lenta=UMBRAL_LENTA, max_detalle=MAX_DETALLE):
+        self.ventana = ventana
+        self.umbral_lenta = umbral_lenta
+        self._tipos = {}     # tipo -> {"latencias": deque, "llamadas", "errores", "filas", "bytes"}
+        self._centros = {}   # centro -> {"llamadas", "errores", "lentas"}
+        self._lentas = deque(maxlen=max_detalle)
+        self._errores = deque(maxlen=max_detalle)
+        self._candado = threading.Lock()
+
+    def registrar(self, tipo, centro, segundos, filas=0, bytes_=0, error=None):
+        detalle = {"hora": datetime.now(chile_time).strftime("%H:%M:%S"), "tipo": tipo,
+                   "centro": centro or SIN_CENTRO, "ms": round(segundos * 1000, 1),
+                   "filas": filas, "error": error}
+        with self._candado:
+            t = self._tipos.setdefault(tipo, {"latencias": deque(maxlen=self.ventana), "llamadas": 0,
+                                              "errores": 0, "filas": 0, "bytes": 0})
+            t["latencias"].append(segundos)
+            t["llamadas"] += 1
+            t["filas"] += filas
+            t["bytes"] += bytes_
+            c = self._centros.setdefault(centro or SIN_CENTRO, {"llamadas": 0, "errores": 0, "lentas": 0})
+            c["llamadas"] += 1
+            if error:
+                t["errores"] += 1
+                c["errores"] += 1
+                self._errores.append(detalle)
+            if segundos >= self.umbral_lenta:
+                c["lentas"] += 1
+                self._lentas.append(detalle)
+
+    def por_tipo(self):
+        """Una fila por tipo de consulta, de la más lenta (p95) a la más rápida."""
+        with self._candado:
+            filas = [{
+                "tipo": tipo,
+                "llamadas": t["llamadas"],
+                "errores_%": round(100 * t["errores"] / t["llamadas"], 1),
+                "p50_ms": round(_percentil(t["latencias"], 50) * 1000, 1),
+                "p95_ms": round(_percentil(t["latencias"], 95) * 1000, 1),
+                "filas_prom": round(t["filas"] / t["llamadas"], 1),
+                "kb_prom": round(t["bytes"] / t["llamadas"] / 1024, 2),
+            } for tipo, t in self._tipos.items()]
+        return sorted(filas, key=lambda f: f["p95_ms"], reverse=True)
+
+    def por_centro(self):
+        with self._candado:
+            return [{"centro": centro, **c, "errores_%": round(100 * c["errores"] / c["llamadas"], 1)}
+                    for centro, c in sorted(self._centros.items())]
+
+    def lentas(self):
+        """Las últimas consultas que pasaron el umbral, la más reciente primero."""
+        with self._candado:
+            return list(reversed(self._lentas))
+
+    def errores(self):
+        with self._candado:
+            return list(reversed(self._errores))
+
+
+class ClienteInstrumentado:
+    """Envuelve un cliente de Supabase y registra cada consulta en 'registro'.
+
+    registro puede ser cualquier objeto con el método registrar() de RegistroConsultas.
+    """
+
+    def __init__(self, cliente, registro, centro=None):
+        self._cliente = cliente
+        self.registro = registro
+        self.centro = centro
+
+    def con_centro(self, centro):
+        """El mismo cliente, pero anotando las consultas a nombre de ese centro."""
+        return ClienteInstrumentado(self._cliente, self.registro, centro)
+
+    def table(self, nombre):
+        return _ConsultaInstrumentada(self._cliente.table(nombre), self, nombre)
+
+    def rpc(self, nombre, parametros=None):
+        parametros = parametros or {}
+        return _ConsultaInstrumentada(self._cliente.rpc(nombre, parametros), self, f"rpc {nombre}",
+                                      len(json.dumps(parametros, default=str)))
+
+
+class _ConsultaInstrumentada:
+    # Deja pasar los métodos del constructor de postgrest-py y va anotando el tipo de consulta
+    def __init__(self, consulta, cliente, tipo, enviados=0):
+        self._consulta, self._cliente, self._tipo, self._enviados = consulta, cliente, tipo, enviados
+
+    def __getattr__(self, nombre):
+        metodo = getattr(self._consulta, nombre)
+        if nombre == "execute":
+            return self._ejecutar
+        if not callable(metodo):
+            return metodo
+
+        def encadenar(*args, **kwargs):
+            tipo, enviados = self._tipo, self._enviados
+            if nombre in OPERACIONES:
+                tipo = f"{tipo}.{nombre}"
+                if args and nombre != "select":
+                    enviados += len(json.dumps(args[0], default=str))
+            elif nombre in FILTROS:
+                tipo += " or" if nombre == "or_" else f" {nombre.rstrip('_')}:{args[0]}"
+            return _ConsultaInstrumentada(metodo(*args, **kwargs), self._cliente, tipo, enviados)
+        return encadenar
+
+    def _ejecutar(self):
+        inicio = time.perf_counter()
+        try:
+            respuesta = self._consulta.execute()
+        except Exception as e:
+            self._cliente.registro.registrar(self._tipo, self._cliente.centro, time.perf_counter() - inicio,
+                                             bytes_=self._enviados, error=f"{type(e).__name__}: {e}"[:300])
+            raise
+        segundos = time.perf_counter() - inicio
+        datos = respuesta.data
+        filas = len(datos) if isinstance(datos, list) else int(bool(datos))
+        self._cliente.registro.registrar(self._tipo, self._cliente.centro, segundos, filas,
+                                         self._enviados + len(json.dumps(datos, default=str)))
+        return respuesta
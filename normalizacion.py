@@ -0,0 +1,71 @@
+# --- NORMALIZACIÓN DE DATOS COMPARTIDA (app.py y carga_masiva.py) ---
+import re
+from itertools import cycle
+
+
+def limpiar_rut(rut):
+    return rut.replace(".", "").replace("-", "").strip().upper()
+
+
+def limpiar_ruts(serie):
+    # Misma limpieza que limpiar_rut, pero sobre una columna completa de pandas.
+    # Si el archivo trae celdas de RUT vacías pandas lee la columna como float
+    # (123456785.0): el ".0" se saca antes que los puntos o quedaría pegado al RUT.
+    return (serie.astype(str)
+                 .str.replace(r"\.0$", "", regex=True)
+                 .str.replace(".", "", regex=False)
+                 .str.replace("-", "", regex=False)
+                 .str.strip()
+                 .str.upper())
+
+
+# --- DÍGITO VERIFICADOR ---
+LARGO_MINIMO_RUT = 8  # cuerpo de 7 dígitos más el DV; más corto y con DV que no calza, está a medio escribir
+
+
+def digito_verificador(cuerpo):
+    """Dígito verificador módulo 11 del cuerpo del RUT (solo números)."""
+    suma = sum(int(d) * f for d, f in zip(reversed(str(cuerpo)), cycle(range(2, 8))))
+    resto = 11 - suma % 11
+    return {11: "0", 10: "K"}.get(resto, str(resto))
+
+
+def es_rut(rut_limpio):
+    # Números con o sin el DV al final; cualquier otra cosa se busca como nombre
+    return re.fullmatch(r"[0-9]+K?", rut_limpio) is not None
+
+
+def rut_valido(rut_limpio):
+    return (re.fullmatch(r"[0-9]{1,8}[0-9K]", rut_limpio) is not None
+            and digito_verificador(rut_limpio[:-1]) == rut_limpio[-1])
+
+
+def formatear_rut(rut_limpio):
+    # "12345678K" -> "12.345.678-K"
+    if len(rut_limpio) < 2 or not rut_limpio[:-1].isdigit():
+        return rut_limpio
+    return f"{int(rut_limpio[:-1]):,}".replace(",", ".") + f"-{rut_limpio[-1]}"
+
+
+# --- CLAVE DE DIRECCIÓN ---
+# "Los Carrera 123", "LOS CARRERA #123" y "los carrera n° 123 " son la misma casa.
+# La que vale es la función clave_direccion de la base de datos: un trigger llena
+# beneficiarios.direccion_clave (supabase/migrations). Esta copia solo se usa
+# cuando una ficha llega sin clave (índice sin conexión) y en los benchmarks.
+_SIN_TILDES = str.maketrans("áéíóúüñ", "aeiouun")
+_NO_ALFANUMERICO = r"[^a-z0-9]+"
+_PREFIJO_NUMERO = r"\b(?:n|no|nro|num|numero) (?=[0-9])"
+
+
+def clave_direccion(direccion):
+    texto = str(direccion or "").lower().translate(_SIN_TILDES)
+    texto = re.sub(_NO_ALFANUMERICO, " ", texto)
+    texto = re.sub(_PREFIJO_NUMERO, "", texto)
+    # Sin dirección no hay hogar: None para no agrupar todas las fichas en blanco
+    return re.sub(r" +", " ", texto).strip() or None
+
+
+def normalizar_nombre(nombre):
+    # "  José  PÉREZ-Muñoz" -> "jose perez munoz", para buscar sin importar tildes ni mayúsculas
+    texto = str(nombre or "").lower().translate(_SIN_TILDES)
+    return re.sub(r" +", " ", re.sub(_NO_ALFANUMERICO, " ", texto)).strip()
@@ -0,0 +1,113 @@
+# --- REINTENTOS Y CONTROL DE SOBRECARGA PARA SUPABASE ---
+# Compartido por la carga masiva (importador.py), la cola del mostrador
+# (cola_local.py), el reporte (reportes.py) y el índice del buscador
+# (indice_ruts.py), sin que app.py tenga que cargar el motor de importación.
+import threading
+import time
+
+import httpx
+
+MAX_REINTENTOS = 3
+ESPERA_BASE = 1.0  # segundos; se duplica en cada reintento
+CODIGOS_SOBRECARGA = {429, 500, 502, 503, 504}
+EXITOS_PARA_SUBIR = 5  # lotes seguidos sin error antes de sumar un envío simultáneo
+
+# Cuando la respuesta es JSON, APIError.code trae el código de PostgREST o el SQLSTATE de Postgres
+CODIGOS_BASE_SATURADA = {
+    "PGRST003",  # se agotó la espera por una conexión del pool (demasiados envíos a la vez)
+    "53300",     # too_many_connections
+    "57014",     # statement_timeout
+}
+CODIGOS_TEMPORALES = CODIGOS_BASE_SATURADA | {
+    "PGRST000", "PGRST001", "PGRST002",  # PostgREST no alcanza la base de datos o su esquema
+    "40001", "40P01",                    # conflicto de serialización, deadlock
+}
+CODIGOS_DATOS = {"PGRST204"}  # columna que no existe en el registro enviado
+
+
+def _codigo(error):
+    return str(getattr(error, "code", None) or "")
+
+
+def es_sobrecarga(error):
+    """True si Supabase respondió 429/5xx, la conexión se cortó o la base no da abasto: hay que bajar el ritmo."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    # postgrest deja el status HTTP en .code cuando la respuesta no es JSON (ej. el 429 del gateway)
+    codigo = _codigo(error)
+    if codigo.isdigit() and int(codigo) in CODIGOS_SOBRECARGA:
+        return True
+    if codigo in CODIGOS_BASE_SATURADA:
+        return True
+    texto = str(error).lower()
+    return "too many requests" in texto or "rate limit" in texto
+
+
+def es_temporal(error):
+    """True si el mismo envío puede funcionar más tarde (vale la pena reintentarlo)."""
+    codigo = _codigo(error)
+    # 08xxx: errores de conexión de Postgres
+    return es_sobrecarga(error) or codigo in CODIGOS_TEMPORALES or codigo.startswith("08")
+
+
+def es_error_de_datos(error):
+    """True si el servidor rechazó lo enviado: 22xxx (dato inválido), 23xxx (restricción) o PGRST204."""
+    codigo = _codigo(error)
+    return (len(codigo) == 5 and codigo.startswith(("22", "23"))) or codigo in CODIGOS_DATOS
+
+
+class ControlConcurrencia:
+    """Limita cuántos lotes viajan a la vez y adapta ese límite a la respuesta del servidor.
+
+    Ante un 429/5xx o una base de datos saturada el límite se reduce a la mitad;
+    tras varios lotes seguidos sin error vuelve a subir de a uno, hasta el máximo pedido.
+    """
+
+    def __init__(self, maximo=1):
+        self.maximo = max(1, int(maximo))
+        self.limite = self.maximo
+        self.en_vuelo = 0
+        self._exitos_seguidos = 0
+        self._condicion = threading.Condition()
+
+    def __enter__(self):
+        with self._condicion:
+            self._condicion.wait_for(lambda: self.en_vuelo < self.limite)
+            self.en_vuelo += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._condicion:
+            self.en_vuelo -= 1
+            self._condicion.notify_all()
+
+    def registrar_exito(self):
+        with self._condicion:
+            self._exitos_seguidos += 1
+            if self._exitos_seguidos >= EXITOS_PARA_SUBIR and self.limite < self.maximo:
+                self.limite += 1
+                self._exitos_seguidos = 0
+                self._condicion.notify_all()
+
+    def registrar_sobrecarga(self):
+        with self._condicion:
+            self.limite = max(1, self.limite // 2)
+            self._exitos_seguidos = 0
+
+
+def enviar_con_reintentos(operacion, max_reintentos=MAX_REINTENTOS, espera_base=ESPERA_BASE,
+                          control=None):
+    # Reintenta una llamada a Supabase con espera exponencial (1s, 2s, 4s...).
+    # Un error permanente (dato malo, columna inexistente...) se lanza de inmediato.
+    for intento in range(max_reintentos + 1):
+        try:
+            respuesta = operacion()
+            if control:
+                control.registrar_exito()
+            return respuesta
+        except Exception as e:
+            if control and es_sobrecarga(e):
+                control.registrar_sobrecarga()
+            if intento == max_reintentos or not es_temporal(e):
+                raise
+            time.sleep(espera_base * (2 ** intento))
@@ -0,0 +1,104 @@
+# --- EXPORTACIÓN DEL REPORTE DE ENTREGAS (usado por app.py) ---
+# Recorre la tabla de entregas por páginas (paginación por llave: fecha_entrega,
+# id) y va escribiendo cada página al archivo. Así el reporte sale completo, sin
+# el tope de filas de la API, y sin tener la tabla entera en memoria.
+import csv
+import io
+import tempfile
+from datetime import datetime, time, timedelta
+
+import openpyxl
+import pytz
+
+from reintentos import enviar_con_reintentos
+
+chile_time = pytz.timezone('America/Santiago')
+
+TAMANO_PAGINA = 1000  # filas pedidas por página; el proyecto puede tener un max_rows menor
+COLUMNAS_ENTREGA = ["id", "fecha_entrega", "rut_beneficiario", "item", "cantidad",
+                    "centro_acopio", "usuario_responsable"]
+COLUMNAS_BENEFICIARIO = ["nombre", "sector", "direccion"]
+
+
+def _inicio_del_dia(fecha):
+    return chile_time.localize(datetime.combine(fecha, time.min)).isoformat()
+
+
+def _a_hora_chile(fecha_iso):
+    return datetime.fromisoformat(fecha_iso).astimezone(chile_time).replace(tzinfo=None)
+
+
+def filas_de_entregas(supabase, desde=None, hasta=None, centro=None, item=None,
+                      con_beneficiario=False, tamano=TAMANO_PAGINA):
+    """Genera las entregas (dicts planos) ordenadas por fecha, página a página.
+
+    desde y hasta son fechas (date) en hora de Chile, ambas incluidas.
+    Con con_beneficiario se agregan nombre, sector y dirección de la ficha.
+    """
+    columnas = ", ".join(COLUMNAS_ENTREGA)
+    if con_beneficiario:
+        columnas += f", beneficiarios({', '.join(COLUMNAS_BENEFICIARIO)})"
+
+    ultima = None
+    while True:
+        consulta = supabase.table("entregas").select(columnas)
+        if desde:
+            consulta = consulta.gte("fecha_entrega", _inicio_del_dia(desde))
+        if hasta:
+            consulta = consulta.lt("fecha_entrega", _inicio_del_dia(hasta + timedelta(days=1)))
+        if centro:
+            consulta = consulta.eq("centro_acopio", centro)
+        if item:
+            consulta = consulta.eq("item", item)
+        if ultima:
+            # Siguiente página: todo lo que viene después de la última fila entregada
+            f, i = ultima["fecha_entrega"], ultima["id"]
+            consulta = consulta.or_(f'fecha_entrega.gt."{f}",and(fecha_entrega.eq."{f}",id.gt.{i})')
+        consulta = consulta.order("fecha_entrega").order("id").limit(tamano)
+
+        pagina = enviar_con_reintentos(consulta.execute).data
+        # Solo una página vacía marca el final: una corta puede ser el max_rows del proyecto
+        if not pagina:
+            return
+        for fila in pagina:
+            plana = {c: fila.get(c) for c in COLUMNAS_ENTREGA}
+            plana["fecha_entrega"] = _a_hora_chile(fila["fecha_entrega"])
+            if con_beneficiario:
+                ficha = fila.get("beneficiarios") or {}
+                plana.update({c: ficha.get(c) for c in COLUMNAS_BENEFICIARIO})
+            yield plana
+        ultima = pagina[-1]
+
+
+def escribir_csv(filas, columnas, destino):
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True)
+    escritor = csv.DictWriter(texto, fieldnames=columnas)
+    escritor.writeheader()
+    for fila in filas:
+        escritor.writerow(fila)
+    texto.detach()  # deja 'destino' abierto para descargarlo
+
+
+def escribir_xlsx(filas, columnas, destino):
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet("Entregas")
+    hoja.append(columnas)
+    for fila in filas:
+        hoja.append([fila[c] for c in columnas])
+    libro.save(destino)
+
+
+def generar_reporte(supabase, formato="csv", con_beneficiario=False, **filtros):
+    """Arma el reporte en un archivo temporal y lo devuelve listo para leer.
+
+    formato es "csv" o "xlsx"; filtros son desde, hasta, centro e item.
+    """
+    columnas = COLUMNAS_ENTREGA + (COLUMNAS_BENEFICIARIO if con_beneficiario else [])
+    filas = filas_de_entregas(supabase, con_beneficiario=con_beneficiario, **filtros)
+    destino = tempfile.TemporaryFile()
+    if formato == "xlsx":
+        escribir_xlsx(filas, columnas, destino)
+    else:
+        escribir_csv(filas, columnas, destino)
+    destino.seek(0)
+    return destino
@@ -0,0 +1,12 @@
+-- Clave de idempotencia para las cargas masivas de entregas (carga_masiva.py).
+-- Cada fila importada lleva "<hash del archivo>:<fila>". Si una carga se corta
+-- y se vuelve a subir el mismo archivo, las filas que ya estaban se ignoran
+-- (upsert ... on conflict do nothing) en vez de duplicar la entrega.
+-- La cola local del mostrador (app.py, cola_local.py) usa la misma columna
+-- con un UUID por entrega.
+
+alter table public.entregas
+    add column if not exists clave_idempotencia text;
+
+create unique index if not exists entregas_clave_idempotencia_key
+    on public.entregas (clave_idempotencia);
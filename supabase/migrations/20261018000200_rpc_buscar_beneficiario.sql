@@ -0,0 +1,45 @@
+-- Búsqueda del mostrador en una sola llamada (app.py).
+-- Devuelve en un JSON la ficha de la persona, los RUT que viven en su misma
+-- dirección, las entregas de HOY (hora de Chile) a cualquiera de ellos y el
+-- historial personal completo. Reemplaza cinco consultas seguidas.
+
+create or replace function public.buscar_beneficiario(p_rut text)
+returns json
+language sql
+stable
+as $$
+    with persona as (
+        select * from public.beneficiarios where rut = p_rut limit 1
+    ),
+    hogar as (
+        select b.rut
+        from public.beneficiarios b
+        join persona p on b.direccion = p.direccion
+    ),
+    hoy as (
+        -- Medianoche a medianoche en Chile, convertida a timestamptz
+        select (date_trunc('day', now() at time zone 'America/Santiago')) at time zone 'America/Santiago' as desde,
+               (date_trunc('day', now() at time zone 'America/Santiago') + interval '1 day') at time zone 'America/Santiago' as hasta
+    )
+    select json_build_object(
+        'persona', (select row_to_json(p) from persona p),
+        'ruts_hogar', coalesce((select json_agg(h.rut) from hogar h), '[]'::json),
+        'entregas_hoy_hogar', coalesce((
+            select json_agg(e order by e.fecha_entrega)
+            from (
+                select en.rut_beneficiario, en.item, en.centro_acopio, en.fecha_entrega, en.clave_idempotencia
+                from public.entregas en, hoy
+                where en.rut_beneficiario in (select rut from hogar)
+                  and en.fecha_entrega >= hoy.desde
+                  and en.fecha_entrega < hoy.hasta
+            ) e
+        ), '[]'::json),
+        'historial', coalesce((
+            select json_agg(e order by e.fecha_entrega desc)
+            from public.entregas e
+            where e.rut_beneficiario = p_rut
+        ), '[]'::json)
+    );
+$$;
+
+grant execute on function public.buscar_beneficiario(text) to anon, authenticated;
@@ -0,0 +1,11 @@
+-- Índices para la ALERTA DE DIRECCIÓN y la búsqueda del mostrador (app.py).
+-- La alerta busca las entregas de HOY de todos los RUT de una dirección:
+-- filtra por rut_beneficiario y por un rango de fecha_entrega. El mismo
+-- índice sirve para el historial personal (ordenado por fecha).
+
+create index if not exists entregas_rut_fecha_idx
+    on public.entregas (rut_beneficiario, fecha_entrega);
+
+-- Para encontrar a quienes viven en la misma dirección sin recorrer el padrón completo.
+create index if not exists beneficiarios_direccion_idx
+    on public.beneficiarios (direccion);
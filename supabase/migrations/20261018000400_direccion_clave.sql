@@ -0,0 +1,88 @@
+-- Clave de dirección normalizada para detectar entregas duplicadas por hogar.
+-- "Los Carrera 123", "LOS CARRERA #123" y "los carrera n° 123 " quedan todas
+-- como 'los carrera 123'. Un trigger la calcula con esta función en cada
+-- ficha que se crea o cambia de dirección, venga de app.py, carga_masiva.py,
+-- el panel de Supabase o SQL directo: los clientes no la envían.
+
+create or replace function public.clave_direccion(p_direccion text)
+returns text
+language sql
+immutable
+as $$
+    select nullif(btrim(regexp_replace(
+        regexp_replace(
+            regexp_replace(translate(lower(coalesce(p_direccion, '')), 'áéíóúüñ', 'aeiouun'),
+                           '[^a-z0-9]+', ' ', 'g'),
+            '\m(n|no|nro|num|numero) (?=[0-9])', '', 'g'),
+        ' +', ' ', 'g')), '');
+$$;
+
+alter table public.beneficiarios
+    add column if not exists direccion_clave text;
+
+create or replace function public.beneficiarios_direccion_clave()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.direccion_clave := public.clave_direccion(new.direccion);
+    return new;
+end;
+$$;
+
+drop trigger if exists beneficiarios_direccion_clave on public.beneficiarios;
+create trigger beneficiarios_direccion_clave
+    before insert or update of direccion, direccion_clave on public.beneficiarios
+    for each row execute function public.beneficiarios_direccion_clave();
+
+-- Fichas que ya existían (o con una clave calculada por una versión anterior de la regla)
+update public.beneficiarios
+set direccion_clave = public.clave_direccion(direccion)
+where direccion_clave is distinct from public.clave_direccion(direccion);
+
+create index if not exists beneficiarios_direccion_clave_idx
+    on public.beneficiarios (direccion_clave);
+
+-- El hogar de la búsqueda del mostrador pasa a ser "misma clave de dirección"
+create or replace function public.buscar_beneficiario(p_rut text)
+returns json
+language sql
+stable
+as $$
+    with persona as (
+        select * from public.beneficiarios where rut = p_rut limit 1
+    ),
+    hogar as (
+        select b.rut
+        from public.beneficiarios b
+        join persona p on b.direccion_clave = coalesce(p.direccion_clave, public.clave_direccion(p.direccion))
+        union
+        select rut from persona
+    ),
+    hoy as (
+        -- Medianoche a medianoche en Chile, convertida a timestamptz
+        select (date_trunc('day', now() at time zone 'America/Santiago')) at time zone 'America/Santiago' as desde,
+               (date_trunc('day', now() at time zone 'America/Santiago') + interval '1 day') at time zone 'America/Santiago' as hasta
+    )
+    select json_build_object(
+        'persona', (select row_to_json(p) from persona p),
+        'ruts_hogar', coalesce((select json_agg(h.rut) from hogar h), '[]'::json),
+        'entregas_hoy_hogar', coalesce((
+            select json_agg(e order by e.fecha_entrega)
+            from (
+                select en.rut_beneficiario, en.item, en.centro_acopio, en.fecha_entrega, en.clave_idempotencia
+                from public.entregas en, hoy
+                where en.rut_beneficiario in (select rut from hogar)
+                  and en.fecha_entrega >= hoy.desde
+                  and en.fecha_entrega < hoy.hasta
+            ) e
+        ), '[]'::json),
+        'historial', coalesce((
+            select json_agg(e order by e.fecha_entrega desc)
+            from public.entregas e
+            where e.rut_beneficiario = p_rut
+        ), '[]'::json)
+    );
+$$;
+
+grant execute on function public.clave_direccion(text) to anon, authenticated;
@@ -0,0 +1,66 @@
+-- Listas de referencia para la barra lateral de app.py (centros y funcionarios
+-- que ya registraron entregas). app.py las guarda en cache unos minutos.
+-- Se guardan en dos tablas chicas que llena un trigger de entregas: leerlas no
+-- recorre la tabla de entregas, que crece con cada retiro.
+
+create table if not exists public.centros_acopio (
+    nombre text primary key
+);
+
+create table if not exists public.funcionarios (
+    nombre text primary key
+);
+
+create or replace function public.entregas_registrar_referencias()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    -- Un trigger por sentencia: una carga masiva de 500 filas hace un solo insert por tabla
+    insert into public.centros_acopio (nombre)
+        select distinct centro_acopio from nuevas
+        where centro_acopio is not null and centro_acopio <> ''
+        on conflict do nothing;
+    insert into public.funcionarios (nombre)
+        select distinct usuario_responsable from nuevas
+        where usuario_responsable is not null and usuario_responsable <> ''
+        on conflict do nothing;
+    return null;
+end;
+$$;
+
+drop trigger if exists entregas_referencias_insert on public.entregas;
+create trigger entregas_referencias_insert
+    after insert on public.entregas
+    referencing new table as nuevas
+    for each statement execute function public.entregas_registrar_referencias();
+
+drop trigger if exists entregas_referencias_update on public.entregas;
+create trigger entregas_referencias_update
+    after update on public.entregas
+    referencing new table as nuevas
+    for each statement execute function public.entregas_registrar_referencias();
+
+-- Lo que ya estaba registrado
+insert into public.centros_acopio (nombre)
+    select distinct centro_acopio from public.entregas
+    where centro_acopio is not null and centro_acopio <> ''
+    on conflict do nothing;
+insert into public.funcionarios (nombre)
+    select distinct usuario_responsable from public.entregas
+    where usuario_responsable is not null and usuario_responsable <> ''
+    on conflict do nothing;
+
+create or replace view public.v_centros_acopio as
+    select nombre as centro_acopio
+    from public.centros_acopio
+    order by nombre;
+
+create or replace view public.v_funcionarios as
+    select nombre as usuario_responsable
+    from public.funcionarios
+    order by nombre;
+
+grant select on public.v_centros_acopio, public.v_funcionarios to anon, authenticated;
@@ -0,0 +1,58 @@
+-- Estadísticas del panel "Ver Estadísticas y Reportes" (app.py), calculadas
+-- en la base de datos. Cada vista devuelve pocas filas, así el panel no baja
+-- la tabla de entregas completa ni queda cortado por el límite de filas de la API.
+-- Son vistas materializadas: leerlas no vuelve a agrupar toda la tabla de
+-- entregas. Se recalculan cada 5 minutos (pg_cron, si el proyecto lo tiene) y
+-- al terminar una carga masiva (carga_masiva.py llama a refrescar_estadisticas).
+-- Las filas de una vista materializada no guardan orden: consultas.py ordena.
+
+create materialized view if not exists public.v_entregas_por_centro as
+    select centro_acopio, count(*) as entregas
+    from public.entregas
+    group by centro_acopio;
+
+create materialized view if not exists public.v_top_familias as
+    select rut_beneficiario, count(*) as retiros
+    from public.entregas
+    group by rut_beneficiario
+    order by retiros desc
+    limit 10;
+
+create materialized view if not exists public.v_totales_por_item as
+    select item, sum(cantidad) as total
+    from public.entregas
+    group by item;
+
+-- refresh ... concurrently necesita un índice único y no bloquea las lecturas del panel
+create unique index if not exists v_entregas_por_centro_centro on public.v_entregas_por_centro (centro_acopio);
+create unique index if not exists v_top_familias_rut on public.v_top_familias (rut_beneficiario);
+create unique index if not exists v_totales_por_item_item on public.v_totales_por_item (item);
+
+create or replace function public.refrescar_estadisticas()
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    refresh materialized view concurrently public.v_entregas_por_centro;
+    refresh materialized view concurrently public.v_top_familias;
+    refresh materialized view concurrently public.v_totales_por_item;
+end;
+$$;
+
+do $$
+begin
+    if exists (select 1 from pg_available_extensions where name = 'pg_cron') then
+        create extension if not exists pg_cron;
+        perform cron.schedule('refrescar-estadisticas', '*/5 * * * *',
+                              'select public.refrescar_estadisticas()');
+    else
+        raise notice 'pg_cron no está disponible: las estadísticas se actualizan solo al terminar una carga masiva';
+    end if;
+end;
+$$;
+
+grant select on public.v_entregas_por_centro, public.v_top_familias, public.v_totales_por_item
+    to anon, authenticated;
+grant execute on function public.refrescar_estadisticas() to anon, authenticated;
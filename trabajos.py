@@ -0,0 +1,81 @@
+# --- TRABAJOS DE IMPORTACIÓN REANUDABLES (usado por carga_masiva.py) ---
+# Cada archivo subido se identifica por su hash. El avance confirmado se guarda
+# en un SQLite local, así si se cierra la pestaña o Streamlit se reinicia a
+# mitad de la carga, al volver a subir el mismo archivo se sigue desde ahí.
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+RUTA_TRABAJOS = os.path.join(".importaciones", "trabajos.sqlite")
+
+
+def _conectar(ruta=RUTA_TRABAJOS):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    conexion = sqlite3.connect(ruta)
+    conexion.row_factory = sqlite3.Row
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS trabajos (
+            hash_archivo    TEXT NOT NULL,
+            modo            TEXT NOT NULL,
+            nombre_archivo  TEXT,
+            fila_confirmada INTEGER NOT NULL DEFAULT 0,
+            exitos          INTEGER NOT NULL DEFAULT 0,
+            terminado       INTEGER NOT NULL DEFAULT 0,
+            actualizado     TEXT,
+            PRIMARY KEY (hash_archivo, modo)
+        )
+    """)
+    return conexion
+
+
+def hash_archivo(archivo):
+    """SHA-256 del contenido del archivo subido."""
+    return hashlib.sha256(archivo.getbuffer()).hexdigest()
+
+
+def clave_idempotencia(hash_archivo, fila):
+    # Estable para la misma fila del mismo archivo: el servidor ignora las repetidas
+    return f"{hash_archivo[:16]}:{fila}"
+
+
+def buscar_trabajo(hash_archivo, modo, ruta=RUTA_TRABAJOS):
+    """Devuelve el trabajo guardado para ese archivo y modo, o None si es nuevo."""
+    with closing(_conectar(ruta)) as conexion, conexion:
+        fila = conexion.execute(
+            "SELECT * FROM trabajos WHERE hash_archivo = ? AND modo = ?",
+            (hash_archivo, modo)).fetchone()
+    return dict(fila) if fila else None
+
+
+def registrar_avance(hash_archivo, modo, nombre_archivo, fila_confirmada, exitos,
+                     terminado=False, ruta=RUTA_TRABAJOS):
+    """Guarda el checkpoint: todas las filas antes de fila_confirmada ya quedaron procesadas."""
+    with closing(_conectar(ruta)) as conexion, conexion:
+        conexion.execute("""
+            INSERT INTO trabajos (hash_archivo, modo, nombre_archivo, fila_confirmada,
+                                  exitos, terminado, actualizado)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (hash_archivo, modo) DO UPDATE SET
+                nombre_archivo = excluded.nombre_archivo,
+                fila_confirmada = excluded.fila_confirmada,
+                exitos = excluded.exitos,
+                terminado = excluded.terminado,
+                actualizado = excluded.actualizado
+        """, (hash_archivo, modo, nombre_archivo, fila_confirmada, exitos, int(terminado),
+              datetime.now().isoformat(timespec="seconds")))
+
+
+def marcar_terminado(hash_archivo, modo, ruta=RUTA_TRABAJOS):
+    with closing(_conectar(ruta)) as conexion, conexion:
+        conexion.execute("UPDATE trabajos SET terminado = 1 WHERE hash_archivo = ? AND modo = ?",
+                         (hash_archivo, modo))
+
+
+def checkpoint(hash_archivo, modo, nombre_archivo, exitos_previos=0, ruta=RUTA_TRABAJOS):
+    """Arma el callback al_confirmar(fila, resumen) que usan los importadores."""
+    def al_confirmar(fila, resumen):
+        registrar_avance(hash_archivo, modo, nombre_archivo, fila,
+                         exitos_previos + resumen["exitos"], ruta=ruta)
+    return al_confirmar